@@ -3,10 +3,75 @@ import subprocess
 import re
 import sys
 import time
+import json
+import glob
+import sqlite3
+import argparse
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 AUDIO_EXT = [".mp3", ".flac", ".wav", ".m4a"]
 VIDEO_EXT = [".mp4", ".mkv", ".webm"]
 
+ASPECT_RATIOS = {"16:9": "1920x1080", "9:16": "1080x1920"}
+
+# codecs each output container can take as-is ("*" = anything)
+COPY_AUDIO = {
+    ".m4a": {"aac", "alac"},
+    ".mp4": {"aac", "alac", "mp3"},
+    ".aac": {"aac"},
+    ".mp3": {"mp3"},
+    ".flac": {"flac"},
+    ".wav": {"pcm_s16le", "pcm_s24le", "pcm_s32le", "pcm_f32le", "pcm_u8"},
+    ".ogg": {"vorbis", "opus", "flac"},
+    ".opus": {"opus"},
+    ".webm": {"vorbis", "opus"},
+    ".mka": {"*"},
+    ".mkv": {"*"},
+}
+# lossless codecs, and the outputs whose default encoder is lossless too
+LOSSLESS_AUDIO = {"flac", "alac", "wavpack", "tta", "truehd", "mlp"}
+LOSSLESS_OUTPUTS = {".flac", ".wav"}
+COPY_VIDEO = {
+    ".mp4": {"h264", "hevc", "av1", "mpeg4"},
+    ".webm": {"vp8", "vp9", "av1"},
+    ".mkv": {"*"},
+}
+# named encoding profiles; crf/preset/tune only apply to libx264, other
+# H.264 encoders get the bitrate, VP9 (for .webm) gets vp9_crf/cpu_used
+PROFILES = {
+    "draft": {"preset": "ultrafast", "crf": 28, "gop": 250, "bitrate": "1M", "vp9_crf": 40, "cpu_used": 8},
+    "web": {"preset": "veryfast", "crf": 23, "gop": 50, "bitrate": "3M", "vp9_crf": 33, "cpu_used": 4},
+    "archival": {"preset": "slow", "crf": 18, "gop": 250, "bitrate": "8M", "vp9_crf": 24, "cpu_used": 1},
+}
+DEFAULT_PROFILE = "web"
+# software first: only libx264 honours crf/tune, and -encoders lists hardware
+# encoders that are compiled in even when the GPU isn't there
+SOFTWARE_ENCODERS = ["libx264", "libopenh264", "libvpx-vp9"]
+H264_ENCODERS = ["libx264", "libopenh264", "h264_videotoolbox", "h264_nvenc", "h264_qsv", "h264_amf", "h264_mf"]
+VP9_ENCODERS = ["libvpx-vp9"]
+# x264 -tune per kind of picture: static backgrounds/spectrograms vs flat waveforms
+TUNES = {"still": "stillimage", "animation": "animation"}
+VISUALIZATION_CONTENT = {"spectrum": "still"}
+_encoders = None
+
+PROBE_CACHE = os.path.join(os.path.expanduser("~"), ".cache", "conv-probe.sqlite3")
+_probe_memory = {}
+_probe_lock = threading.Lock()
+_probe_db = None
+
+
+# menu order matches choose_visualization (1-6)
+VISUALIZATIONS = {
+    "line": "[0:a]showwaves=s={res}:mode=line:rate=25:colors={color}[vid]",
+    "cline": "[0:a]showwaves=s={res}:mode=cline:rate=25:colors={color}[vid]",
+    "p2p": "[0:a]showwaves=s={res}:mode=p2p:rate=25:colors={color}[vid]",
+    "bar": "[0:a]showwaves=s={res}:mode=bar:rate=25:colors={color}[vid]",
+    "spectrum": "[0:a]showspectrum=s={res}:mode=combined:color=fire:scale=log[vid]",
+    "overlay": "[0:a]showspectrum=s={res}:mode=combined:color=fire:scale=log[spec];[0:a]showwaves=s={res}:mode=cline:rate=25:colors={color}[waves];[spec][waves]overlay=0:0[vid]",
+}
+
 def choose_aspect_ratio():
     print("Choose Aspect Ratio:")
     print("1 = 16:9 (1920x1080)")
@@ -31,61 +96,593 @@ def choose_visualization(resolution, inpu, out, ab):
 
     color = input("Enter wave/spectrum color (def=white): ").strip() or "white"
 
-    if choice == "1":
-        return f'ffmpeg -i "{inpu}" -filter_complex "[0:a]showwaves=s={resolution}:mode=line:rate=25:colors={color}[vid]" -map "[vid]" -map 0:a -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
-    elif choice == "2":
-        return f'ffmpeg -i "{inpu}" -filter_complex "[0:a]showwaves=s={resolution}:mode=cline:rate=25:colors={color}[vid]" -map "[vid]" -map 0:a -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
-    elif choice == "3":
-        return f'ffmpeg -i "{inpu}" -filter_complex "[0:a]showwaves=s={resolution}:mode=p2p:rate=25:colors={color}[vid]" -map "[vid]" -map 0:a -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
-    elif choice == "4":
-        return f'ffmpeg -i "{inpu}" -filter_complex "[0:a]showwaves=s={resolution}:mode=bar:rate=25:colors={color}[vid]" -map "[vid]" -map 0:a -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
-    elif choice == "5":
-        return f'ffmpeg -i "{inpu}" -filter_complex "[0:a]showspectrum=s={resolution}:mode=combined:color=fire:scale=log[vid]" -map "[vid]" -map 0:a -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
-    elif choice == "6":
-        return f'ffmpeg -i "{inpu}" -filter_complex "[0:a]showspectrum=s={resolution}:mode=combined:color=fire:scale=log[spec];[0:a]showwaves=s={resolution}:mode=cline:rate=25:colors={color}[waves];[spec][waves]overlay=0:0[vid]" -map "[vid]" -map 0:a -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
-    else:
+    styles = list(VISUALIZATIONS)
+    if not choice.isdigit() or not 1 <= int(choice) <= len(styles):
         raise ValueError("Invalid choice (must be 1-6).")
+    style = styles[int(choice) - 1]
+    filt = VISUALIZATIONS[style].format(res=resolution, color=color)
+    codecs = " ".join(encode_args(out, VISUALIZATION_CONTENT.get(style, "animation")))
+    return f'ffmpeg -i "{inpu}" -filter_complex "{filt}" -map "[vid]" -map 0:a {codecs} -b:a {ab} -shortest "{out}"'
+
+# ENCODER PROFILES
+def available_encoders():
+    """Encoder names compiled into the local ffmpeg (empty if it can't be asked)"""
+    global _encoders
+    if _encoders is None:
+        _encoders = set()
+        try:
+            result = subprocess.run(["ffmpeg", "-hide_banner", "-encoders"],
+                                    stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True)
+        except OSError:
+            return _encoders
+        for line in result.stdout.splitlines():
+            parts = line.split()
+            # " V....D libx264   libx264 H.264 ..."
+            if len(parts) >= 2 and len(parts[0]) == 6 and parts[0][0] in "VAS" and parts[1] != "=":
+                _encoders.add(parts[1])
+    return _encoders
+
+def pick_video_encoder(out_ext, encoder=None):
+    if encoder:
+        return encoder
+    candidates = VP9_ENCODERS if out_ext.lower() == ".webm" else H264_ENCODERS
+    found = available_encoders()
+    for name in candidates:
+        if name in found:
+            return name
+    # unknown build: ask for the usual one and let ffmpeg report it
+    return candidates[0]
+
+def encode_args(out, content="video", profile=DEFAULT_PROFILE, threads=None, encoder=None):
+    """-c:v/-c:a and tuning for a profile; content is 'still', 'animation' or 'video'"""
+    settings = PROFILES[profile]
+    out_ext = os.path.splitext(out)[1].lower()
+    name = pick_video_encoder(out_ext, encoder)
+    args = ["-c:v", name]
+    if name == "libx264":
+        args += ["-preset", settings["preset"], "-crf", str(settings["crf"])]
+        if content in TUNES:
+            args += ["-tune", TUNES[content]]
+    elif name.startswith("libvpx"):
+        args += ["-crf", str(settings["vp9_crf"]), "-b:v", "0", "-cpu-used", str(settings["cpu_used"]), "-row-mt", "1"]
+    else:
+        args += ["-b:v", settings["bitrate"]]
+    args += ["-g", str(settings["gop"])]
+    if name in SOFTWARE_ENCODERS:
+        # visualizations render rgba; yuv420p keeps the output playable everywhere.
+        # hardware encoders pick their own format (h264_qsv needs nv12)
+        args += ["-pix_fmt", "yuv420p"]
+    if threads:
+        args += ["-threads", str(threads)]
+    if profile == "web" and out_ext in (".mp4", ".m4v", ".mov"):
+        args += ["-movflags", "+faststart"]
+    args += ["-c:a", "libopus" if out_ext == ".webm" else "aac"]
+    return args
+
+# PROBE
+def _probe_store():
+    global _probe_db
+    if _probe_db is None:
+        # the cache is only a speed-up; without it every file is simply probed
+        try:
+            os.makedirs(os.path.dirname(PROBE_CACHE), exist_ok=True)
+            _probe_db = sqlite3.connect(PROBE_CACHE, timeout=2, check_same_thread=False)
+            _probe_db.execute("CREATE TABLE IF NOT EXISTS probes (path TEXT PRIMARY KEY, size INTEGER, mtime INTEGER, data TEXT)")
+        except (OSError, sqlite3.Error):
+            _probe_db = False
+    return _probe_db or None
+
+def probe(input_file):
+    """ffprobe format + streams as a dict; one ffprobe per (path, size, mtime), cached in memory and on disk"""
+    path = os.path.abspath(input_file)
+    try:
+        st = os.stat(path)
+        key = (path, st.st_size, st.st_mtime_ns)
+    except OSError:
+        key = None
+
+    if key:
+        with _probe_lock:
+            if key in _probe_memory:
+                return _probe_memory[key]
+            db = _probe_store()
+            try:
+                row = db.execute("SELECT data FROM probes WHERE path=? AND size=? AND mtime=?", key).fetchone() if db else None
+                if row:
+                    _probe_memory[key] = json.loads(row[0])
+                    return _probe_memory[key]
+            except (sqlite3.Error, ValueError):
+                pass
 
-def get_duration(input_file):
     result = subprocess.run(
-        ["ffprobe", "-v", "error", "-show_entries", "format=duration", 
-         "-of", "default=noprint_wrappers=1:nokey=1", input_file],
+        ["ffprobe", "-v", "error", "-show_format", "-show_streams", "-of", "json", input_file],
         stdout=subprocess.PIPE,
         stderr=subprocess.PIPE,
         text=True
     )
     try:
-        return float(result.stdout.strip())
-    except:
+        data = json.loads(result.stdout)
+    except ValueError:
+        data = {}
+
+    # failures are not cached; the file may just be mid-copy
+    if key and data.get("format"):
+        with _probe_lock:
+            _probe_memory[key] = data
+            db = _probe_store()
+            if db:
+                try:
+                    db.execute("INSERT OR REPLACE INTO probes VALUES (?, ?, ?, ?)", (*key, json.dumps(data)))
+                    db.commit()
+                except sqlite3.Error:
+                    # e.g. locked by another conv.py; the next run will store it
+                    try:
+                        db.rollback()
+                    except sqlite3.Error:
+                        pass
+    return data
+
+def get_duration(input_file):
+    try:
+        return float(probe(input_file)["format"]["duration"])
+    except (KeyError, TypeError, ValueError):
         return None
 
-def run_with_progress(command, input_file):
+def probe_streams(input_file):
+    """First audio and video stream (cover art is not video), plus the format section"""
+    data = probe(input_file)
+    info = {"audio": None, "video": None, "format": data.get("format", {})}
+    for stream in data.get("streams", []):
+        kind = stream.get("codec_type")
+        if kind == "video" and stream.get("disposition", {}).get("attached_pic"):
+            continue
+        if kind in info and info[kind] is None:
+            info[kind] = stream
+    return info
+
+def parse_bitrate(ab):
+    """'320k' -> 320000"""
+    ab = str(ab).strip().lower()
+    scale = {"k": 1000, "m": 1000000}.get(ab[-1:], 1)
+    try:
+        return int(float(ab.rstrip("km")) * scale)
+    except ValueError:
+        return 0
+
+def is_lossless(codec):
+    return codec in LOSSLESS_AUDIO or (codec or "").startswith("pcm_")
+
+def stream_bitrate(stream, fmt=None):
+    """Bits/s of an audio stream; FLAC and Matroska often only carry it in tags or the format"""
+    tags = {k.upper(): v for k, v in (stream.get("tags") or {}).items()}
+    for value in (stream.get("bit_rate"), tags.get("BPS"), tags.get("BPS-ENG"), (fmt or {}).get("bit_rate")):
+        try:
+            if value and int(value) > 0:
+                return int(value)
+        except ValueError:
+            continue
+    return 0
+
+def can_copy_audio(stream, out_ext, ab, fmt=None):
+    """Copy when the container takes the codec and nothing would be gained by re-encoding.
+
+    Lossless to a lossless output (FLAC, WAV) always copies: those encoders ignore -ab.
+    Otherwise the source must be no bigger than `ab` asks for.
+    """
+    if not stream:
+        return False
+    codec = stream.get("codec_name")
+    out_ext = out_ext.lower()
+    allowed = COPY_AUDIO.get(out_ext, ())
+    if codec not in allowed and "*" not in allowed:
+        return False
+    if is_lossless(codec) and out_ext in LOSSLESS_OUTPUTS:
+        return True
+    return 0 < stream_bitrate(stream, fmt) <= parse_bitrate(ab)
+
+def can_remux_video(info, out_ext, resolution, ab):
+    """A re-encode is a no-op when the video is already `resolution` in a codec the container takes"""
+    video = info["video"]
+    if not video:
+        return False
+    allowed = COPY_VIDEO.get(out_ext.lower(), ())
+    if video.get("codec_name") not in allowed and "*" not in allowed:
+        return False
+    if f"{video.get('width')}x{video.get('height')}" != resolution:
+        return False
+    return info["audio"] is None or can_copy_audio(info["audio"], out_ext, ab, info["format"])
+
+def extract_audio_command(inpu, out, ab="320k", threads=None):
+    """Stream-copy the audio when that is lossless and valid, else transcode at `ab`"""
+    info = probe_streams(inpu)
+    audio = info["audio"]
+    if can_copy_audio(audio, os.path.splitext(out)[1], ab, info["format"]):
+        # map the stream that was checked; ffmpeg's own pick is the one with the most channels
+        return ["ffmpeg", "-i", inpu, "-map", f"0:{audio['index']}", "-c:a", "copy", out]
+    thread_args = ["-threads", str(threads)] if threads else []
+    return ["ffmpeg", "-i", inpu, "-vn", "-ab", ab, *thread_args, out]
+
+def reencode_video_command(inpu, out, resolution, ab="320k", threads=None, profile=DEFAULT_PROFILE, encoder=None):
+    """Scale and re-encode, or just remux when the source already matches"""
+    info = probe_streams(inpu)
+    if can_remux_video(info, os.path.splitext(out)[1], resolution, ab):
+        maps = ["-map", f"0:{info['video']['index']}"]
+        if info["audio"]:
+            maps += ["-map", f"0:{info['audio']['index']}"]
+        return ["ffmpeg", "-i", inpu, *maps, "-c", "copy", out]
+    codecs = encode_args(out, "video", profile, threads, encoder)
+    return ["ffmpeg", "-i", inpu, "-vf", f"scale={resolution}", *codecs, "-b:a", ab, out]
+
+def build_command(inpu, out, ab="320k", aspect="16:9", visualization=None, color="white", background=None, threads=None, profile=DEFAULT_PROFILE, encoder=None):
+    """ffmpeg argv for one file, making the same choices main() asks for"""
+    resolution = ASPECT_RATIOS[aspect]
+    ext = os.path.splitext(inpu)[1].lower()
+    to_video = os.path.splitext(out)[1].lower() in VIDEO_EXT
+
+    if ext in AUDIO_EXT and to_video:
+        if visualization:
+            filt = VISUALIZATIONS[visualization].format(res=resolution, color=color)
+            cmd = ["ffmpeg", "-i", inpu, "-filter_complex", filt, "-map", "[vid]", "-map", "0:a"]
+            content = VISUALIZATION_CONTENT.get(visualization, "animation")
+        elif background:
+            cmd = ["ffmpeg", "-loop", "1", "-i", background, "-i", inpu, "-s", resolution]
+            content = "still"
+        else:
+            cmd = ["ffmpeg", "-f", "lavfi", "-i", f"color=c=black:s={resolution}", "-i", inpu]
+            content = "still"
+        return cmd + encode_args(out, content, profile, threads, encoder) + ["-b:a", ab, "-shortest", out]
+    if ext in VIDEO_EXT and to_video:
+        return reencode_video_command(inpu, out, resolution, ab, threads, profile, encoder)
+    if ext in AUDIO_EXT + VIDEO_EXT:
+        return extract_audio_command(inpu, out, ab, threads)
+    raise ValueError("Unsupported input file type.")
+
+# PROGRESS
+def with_progress_flags(command):
+    """Have ffmpeg report key=value progress blocks on stdout instead of stats on stderr"""
+    if isinstance(command, str):
+        return re.sub(r"^\s*ffmpeg\b", "ffmpeg -progress pipe:1 -nostats", command, count=1)
+    return command[:1] + ["-progress", "pipe:1", "-nostats"] + command[1:]
+
+def _number(value):
+    try:
+        return float(str(value).rstrip("x"))
+    except ValueError:
+        return None
+
+def progress_event(fields, total_duration, elapsed, done):
+    """One ffmpeg progress block as a dict; progress/eta stay None when the duration is unknown"""
+    out_us = _number(fields.get("out_time_us", fields.get("out_time_ms")))
+    current = max(out_us / 1e6, 0.0) if out_us is not None else None
+    speed = _number(fields.get("speed"))
+    size = _number(fields.get("total_size"))
+    event = {
+        "time": current,
+        "duration": total_duration,
+        "progress": None,
+        "eta": None,
+        "speed": speed,
+        "fps": _number(fields.get("fps")),
+        "size": int(size) if size is not None else None,
+        "throughput": size / elapsed if size and elapsed > 0 else None,
+        "elapsed": round(elapsed, 3),
+        "done": done,
+    }
+    if total_duration and current is not None:
+        event["progress"] = 1.0 if done else min(current / total_duration, 1.0)
+        remaining = max(total_duration - current, 0.0)
+        if done:
+            event["eta"] = 0.0
+        elif speed:
+            event["eta"] = remaining / speed
+        elif current > 0:
+            event["eta"] = elapsed * remaining / current
+    return event
+
+def run_ffmpeg(command, total_duration=None, on_event=None):
+    """Run ffmpeg, calling on_event for every progress update; returns (returncode, last stderr lines)"""
+    process = subprocess.Popen(with_progress_flags(command), shell=isinstance(command, str),
+                               stdout=subprocess.PIPE, stderr=subprocess.PIPE, text=True, errors="replace")
+    # with -nostats stderr only carries warnings and errors; keep the last few
+    tail = deque(maxlen=5)
+    drain = threading.Thread(target=lambda: tail.extend(line.strip() for line in process.stderr), daemon=True)
+    drain.start()
+
+    started = time.time()
+    fields = {}
+    for line in process.stdout:
+        key, _, value = line.strip().partition("=")
+        if key != "progress":
+            fields[key] = value
+            continue
+        if on_event:
+            on_event(progress_event(fields, total_duration, time.time() - started, value == "end"))
+
+    returncode = process.wait()
+    drain.join()
+    return returncode, [line for line in tail if line]
+
+def format_hms(seconds):
+    seconds = int(seconds)
+    return f"{seconds // 3600:d}:{seconds // 60 % 60:02d}:{seconds % 60:02d}"
+
+def format_progress(event, bar_len=40):
+    if event["progress"] is not None:
+        filled = int(bar_len * event["progress"])
+        parts = [f"[{'█' * filled}{'-' * (bar_len - filled)}] {event['progress']*100:5.1f}%"]
+    else:
+        parts = [f"time {format_hms(event['time'] or 0)}"]
+    if event["speed"]:
+        parts.append(f"{event['speed']:.1f}x")
+    if event["eta"] is not None:
+        parts.append(f"ETA {format_hms(event['eta'])}")
+    if event["size"]:
+        parts.append(f"{event['size'] / 1e6:.1f} MB")
+    return "  ".join(parts)
+
+def json_lines_sink(stream):
+    """Progress callback writing each event as one JSON line (safe to share between jobs)"""
+    lock = threading.Lock()
+
+    def sink(event):
+        with lock:
+            stream.write(json.dumps(event) + "\n")
+            stream.flush()
+    return sink
+
+def run_with_progress(command, input_file, on_event=None):
     total_duration = get_duration(input_file)
     if not total_duration:
-        print("Could not determine duration. Running without progress bar...")
-        subprocess.run(command, shell=True)
+        print("Could not determine duration. Showing encoded time instead of a percentage...")
+    width = [0]
+
+    def show(event):
+        line = format_progress(event)
+        sys.stdout.write("\r" + line.ljust(width[0]))
+        sys.stdout.flush()
+        width[0] = max(width[0], len(line))
+        if on_event:
+            on_event(event)
+
+    returncode, errors = run_ffmpeg(command, total_duration, show)
+    if returncode == 0:
+        print("\n ✓ Done!")
+    else:
+        print(f"\n ✗ ffmpeg failed: {errors[-1] if errors else f'exit code {returncode}'}")
+    return returncode
+
+# BATCH MODE
+class ThreadBudget:
+    """Counts encoder threads in use so parallel jobs never oversubscribe the cores"""
+
+    def __init__(self, total):
+        self.total = total
+        self.used = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, n):
+        n = min(n, self.total)
+        with self.cond:
+            while self.used + n > self.total:
+                self.cond.wait()
+            self.used += n
+        return n
+
+    def release(self, n):
+        with self.cond:
+            self.used -= n
+            self.cond.notify_all()
+
+def collect_inputs(patterns):
+    """Expand directories and globs (** included) into supported media files"""
+    files = []
+    seen = set()
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            matches = [os.path.join(pattern, n) for n in sorted(os.listdir(pattern))]
+        else:
+            matches = sorted(glob.glob(pattern, recursive=True))
+        for path in matches:
+            ext = os.path.splitext(path)[1].lower()
+            if os.path.isfile(path) and ext in AUDIO_EXT + VIDEO_EXT and path not in seen:
+                seen.add(path)
+                files.append(path)
+    return files
+
+def make_jobs(files, ext="mp4", ab="320k", aspect="16:9", visualization=None, color="white", background=None, out_dir=None, threads=None, overwrite=False, profile=DEFAULT_PROFILE, encoder=None):
+    """One job per input file; video encodes default to 2 threads, audio to 1.
+
+    Inputs that would map to the same output get -2, -3... suffixes, and
+    inputs whose name another input claims (e.g. last night's .mp4 of a
+    .mp3 in the batch) are skipped rather than converted onto themselves.
+    An input that would convert onto itself with no such source fails.
+    """
+    outputs = {}
+    claimed = set()
+
+    def claim(inpu):
+        name = os.path.splitext(os.path.basename(inpu))[0]
+        folder = out_dir or os.path.dirname(inpu)
+        out = os.path.join(folder, f"{name}.{ext}")
+        n = 2
+        while os.path.abspath(out) in claimed:
+            out = os.path.join(folder, f"{name}-{n}.{ext}")
+            n += 1
+        claimed.add(os.path.abspath(out))
+        outputs[inpu] = out
+
+    # name the real sources first so the names don't depend on earlier outputs being present
+    same_format = [f for f in files if os.path.splitext(f)[1].lower() == "." + ext.lower()]
+    for inpu in files:
+        if inpu not in same_format:
+            claim(inpu)
+    for inpu in same_format:
+        if os.path.abspath(inpu) not in claimed:
+            claim(inpu)
+
+    jobs = []
+    for inpu in files:
+        out = outputs.get(inpu)
+        job = {"input": inpu, "output": out or inpu, "progress": 0.0, "status": "pending", "error": ""}
+        if out is None:
+            job.update(status="skipped", progress=1.0, error="is an output of this batch")
+        elif os.path.abspath(out) == os.path.abspath(inpu):
+            job.update(status="failed", error="output would overwrite input (use --out-dir)")
+        elif os.path.exists(out) and not overwrite:
+            job.update(status="skipped", progress=1.0)
+        else:
+            video = "." + ext.lower() in VIDEO_EXT
+            job["threads"] = threads or (2 if video else 1)
+            job["spec"] = {"ab": ab, "aspect": aspect, "visualization": visualization, "color": color,
+                           "background": background, "profile": profile, "encoder": encoder}
+        jobs.append(job)
+    return jobs
+
+def final_event(job):
+    """The last record a job monitor gets for every input, however the job ended"""
+    return {"input": job["input"], "output": job["output"], "status": job["status"], "error": job["error"], "done": True}
+
+def run_job(job, budget, on_event=None):
+    # planning probes the file, so it happens here in parallel rather than up front
+    try:
+        cmd = build_command(job["input"], job["output"], threads=job["threads"], **job["spec"])
+    except Exception as e:
+        job.update(status="failed", error=str(e))
+        if on_event:
+            on_event(final_event(job))
         return
+    if "copy" in cmd:
+        # a remux is I/O bound, it needs no encoder threads
+        job["threads"] = 1
+    job["command"] = cmd[:1] + ["-nostdin", "-y"] + cmd[1:]
 
-    process = subprocess.Popen(command, shell=True, stderr=subprocess.PIPE, text=True, bufsize=1)
-    time_pattern = re.compile(r"time=(\d+:\d+:\d+\.\d+)")
+    threads = budget.acquire(job["threads"])
+    try:
+        job["status"] = "running"
 
-    def hms_to_sec(hms):
-        h, m, s = hms.split(":")
-        return int(h) * 3600 + int(m) * 60 + float(s)
+        def track(event):
+            job["event"] = event
+            if event["progress"] is not None:
+                job["progress"] = event["progress"]
+            if on_event:
+                on_event(dict(event, input=job["input"], output=job["output"]))
+
+        returncode, errors = run_ffmpeg(job["command"], get_duration(job["input"]), track)
+        if returncode == 0:
+            job.update(status="done", progress=1.0)
+        else:
+            job.update(status="failed", error=errors[-1] if errors else f"ffmpeg exited with {returncode}")
+            if os.path.exists(job["output"]):
+                os.remove(job["output"])
+    except Exception as e:
+        job.update(status="failed", error=str(e))
+    finally:
+        budget.release(threads)
+        if on_event:
+            on_event(final_event(job))
 
-    for line in process.stderr:
-        match = time_pattern.search(line)
-        if match:
-            current_time = hms_to_sec(match.group(1))
-            progress = min(current_time / total_duration, 1.0)
-            bar_len = 40
-            filled = int(bar_len * progress)
-            bar = "█" * filled + "-" * (bar_len - filled)
-            sys.stdout.write(f"\r[{bar}] {progress*100:5.1f}%")
-            sys.stdout.flush()
+def draw_batch(jobs, started, drawn):
+    """Redraw per-job bars plus an aggregate bar; returns the number of lines written"""
+    running = [j for j in jobs if j["status"] == "running"]
+    finished = sum(j["status"] in ("done", "skipped") for j in jobs)
+    failed = sum(j["status"] == "failed" for j in jobs)
+    overall = sum(1.0 if j["status"] in ("done", "skipped", "failed") else j["progress"] for j in jobs) / len(jobs)
 
-    process.wait()
-    print("\n ✓ Done!")
+    lines = []
+    for job in running:
+        event = job.get("event")
+        status = format_progress(event, 20) if event else "starting"
+        lines.append(f"  {status}  {os.path.basename(job['input'])}")
+    elapsed = time.time() - started
+    eta = f", ETA {format_hms(elapsed * (1 - overall) / overall)}" if 0 < overall < 1 else ""
+    filled = int(40 * overall)
+    lines.append(f"[{'█' * filled}{'-' * (40 - filled)}] {overall*100:5.1f}%  {finished}/{len(jobs)} done, {failed} failed, {len(running)} running, {format_hms(elapsed)}{eta}")
+
+    if drawn:
+        sys.stdout.write(f"\x1b[{drawn}F")
+    sys.stdout.write("\x1b[J" + "\n".join(lines) + "\n")
+    sys.stdout.flush()
+    return len(lines)
+
+def run_batch(jobs, max_jobs=None, show_progress=True, on_event=None):
+    """Run jobs in parallel, capped by core count and each job's encoder threads.
+
+    on_event gets every job's progress events, tagged with input and output.
+    """
+    cores = os.cpu_count() or 1
+    budget = ThreadBudget(cores)
+    todo = [j for j in jobs if j["status"] == "pending"]
+    started = time.time()
+    live = show_progress and sys.stdout.isatty()
+    drawn = 0
+    if on_event:
+        # skipped and self-overwriting inputs never run, but still get accounted for
+        for job in jobs:
+            if job["status"] != "pending":
+                on_event(final_event(job))
+
+    with ThreadPoolExecutor(max_workers=max(1, min(max_jobs or cores, len(todo) or 1))) as pool:
+        futures = [pool.submit(run_job, job, budget, on_event) for job in todo]
+        reported = set()
+        while True:
+            all_done = all(f.done() for f in futures)
+            if live:
+                drawn = draw_batch(jobs, started, drawn)
+            elif show_progress:
+                for job in jobs:
+                    if job["status"] in ("done", "failed") and id(job) not in reported:
+                        reported.add(id(job))
+                        mark = "✓" if job["status"] == "done" else "✗"
+                        print(f"{mark} {job['input']} {job['error']}".rstrip())
+            if all_done:
+                break
+            time.sleep(0.5)
+
+    if live:
+        for job in jobs:
+            if job["status"] == "failed":
+                print(f"✗ {job['input']}: {job['error']}")
+    return jobs
+
+def batch_main(argv):
+    parser = argparse.ArgumentParser(description="Convert many files with the same settings")
+    parser.add_argument("inputs", nargs="+", help="files, directories or glob patterns (quote ** globs)")
+    parser.add_argument("-e", "--ext", default="mp4", help="output extension (default: mp4)")
+    parser.add_argument("-b", "--bitrate", default="320k", help="audio bitrate (default: 320k)")
+    parser.add_argument("-a", "--aspect", choices=ASPECT_RATIOS, default="16:9", help="video aspect ratio")
+    parser.add_argument("-v", "--viz", choices=VISUALIZATIONS, help="waveform/spectrum style for audio to video")
+    parser.add_argument("-c", "--color", default="white", help="wave/spectrum color")
+    parser.add_argument("--background", help="background image for audio to video (no --viz)")
+    parser.add_argument("-o", "--out-dir", help="write outputs here instead of next to the inputs")
+    parser.add_argument("-j", "--jobs", type=int, help="max parallel jobs (default: by core count)")
+    parser.add_argument("-t", "--threads", type=int, help="encoder threads per job")
+    parser.add_argument("-p", "--profile", choices=PROFILES, default=DEFAULT_PROFILE, help=f"encoding profile (default: {DEFAULT_PROFILE})")
+    parser.add_argument("--encoder", help="video encoder to use instead of the detected one (e.g. h264_nvenc)")
+    parser.add_argument("--overwrite", action="store_true", help="redo outputs that already exist")
+    parser.add_argument("--progress-json", metavar="FILE", help="append progress events as JSON lines (- for stdout)")
+    args = parser.parse_args(argv)
+
+    files = collect_inputs(args.inputs)
+    if not files:
+        parser.error("no supported input files found")
+    if args.out_dir:
+        os.makedirs(args.out_dir, exist_ok=True)
+
+    jobs = make_jobs(files, args.ext.lstrip(".").lower(), args.bitrate, args.aspect, args.viz, args.color,
+                     args.background, args.out_dir, args.threads, args.overwrite, args.profile, args.encoder)
+    if args.progress_json == "-":
+        run_batch(jobs, args.jobs, show_progress=False, on_event=json_lines_sink(sys.stdout))
+    elif args.progress_json:
+        with open(args.progress_json, "a") as log:
+            run_batch(jobs, args.jobs, on_event=json_lines_sink(log))
+    else:
+        run_batch(jobs, args.jobs)
+    failed = sum(j["status"] == "failed" for j in jobs)
+    skipped = sum(j["status"] == "skipped" for j in jobs)
+    # keep stdout pure JSON lines when that's where the events went
+    summary = sys.stderr if args.progress_json == "-" else sys.stdout
+    print(f" ✓ {len(jobs) - failed - skipped} converted, {skipped} skipped (already done), {failed} failed", file=summary)
+    return 1 if failed else 0
 
 def main():
     inpu = input("Enter input file path: ").strip()
@@ -114,28 +711,32 @@ def main():
                 bg_choice = input("Use background image? (y/n): ").strip().lower()
                 if bg_choice == "y":
                     bg = input("Enter background image path: ").strip()
-                    comm = f'ffmpeg -loop 1 -i "{bg}" -i "{inpu}" -c:v libx264 -c:a aac -b:a {ab} -shortest -s {resolution} "{out}"'
+                    comm = f'ffmpeg -loop 1 -i "{bg}" -i "{inpu}" {" ".join(encode_args(out, "still"))} -b:a {ab} -shortest -s {resolution} "{out}"'
                 else:
-                    comm = f'ffmpeg -f lavfi -i color=c=black:s={resolution} -i "{inpu}" -c:v libx264 -c:a aac -b:a {ab} -shortest "{out}"'
+                    comm = f'ffmpeg -f lavfi -i color=c=black:s={resolution} -i "{inpu}" {" ".join(encode_args(out, "still"))} -b:a {ab} -shortest "{out}"'
         else:
-            comm = f'ffmpeg -i "{inpu}" -vn -ab {ab} "{out}"'
+            comm = extract_audio_command(inpu, out, ab)
 
     # VIDEO INPUT
     elif ext.lower() in VIDEO_EXT:
         action = input("Choose action: \n1 = Extract Audio \n2 = Re-encode Video \nEnter choice: ").strip()
         if action == "1":
-            comm = f'ffmpeg -i "{inpu}" -vn -ab {ab} "{out}"'
+            comm = extract_audio_command(inpu, out, ab)
         elif action == "2":
             resolution = choose_aspect_ratio()
-            comm = f'ffmpeg -i "{inpu}" -vf scale={resolution} -c:v libx264 -c:a aac -b:a {ab} "{out}"'
+            comm = reencode_video_command(inpu, out, resolution, ab)
         else:
             raise ValueError("Invalid choice (must be 1 or 2).")
 
     else:
         raise ValueError("Unsupported input file type.")
 
+    if isinstance(comm, list) and "copy" in comm:
+        print("\nStreams already fit the output, copying without re-encoding.")
     print("\nRunning command with progress bar...\n")
     run_with_progress(comm, inpu)
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        sys.exit(batch_main(sys.argv[1:]))
     main()
@@ -1,18 +1,31 @@
 import time
+import asyncio
 import subprocess
 import os
 import json
 import re
 import requests
+import requests.adapters
 import socket
 import random
 import threading
 import sys
 import termios
 import tty
-import select
+import sqlite3
+import argparse
+from array import array
+import shutil
+import signal
+from urllib.parse import urlparse, parse_qs
+import heapq
+import itertools
+import math
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor, wait, FIRST_COMPLETED
 from dataclasses import dataclass
-from typing import Optional, List
+from typing import Optional, List, Dict, Callable, Tuple, NamedTuple
 
 from rich.console import Console
 from rich.panel import Panel
@@ -21,64 +34,349 @@ from rich.live import Live
 from rich.align import Align
 from ytmusicapi import YTMusic
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 console = Console()
 
+CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache")
+
 
 
 class KeyboardListener:
-    def __init__(self):
-        self.key_pressed = None
-        self.running = False
-        self.thread = None
-    
-    def start(self):
-        
-        self.running = True
-        self.thread = threading.Thread(target=self._listen, daemon=True)
-        self.thread.start()
-    
+    """Cbreak-mode stdin, read from the event loop via add_reader (no polling thread).
+
+    Bytes are decoded into named keys (arrows and CSI-u media keys
+    included) and every key is dispatched in order as soon as it arrives.
+    Terminals that speak the kitty keyboard protocol only send media keys
+    once asked to report every key as an escape code, so start() pushes
+    that mode and stop() pops it; other terminals ignore both sequences.
+    """
+
+    NAMES = {
+        0x17: "ctrl_w",
+        0x1b: "escape",
+        0x20: "space",
+    }
+    ARROWS = {"A": "up", "B": "down", "C": "right", "D": "left"}
+    # disambiguate (1) + report all keys as escape codes (8); letters then arrive as CSI <code> u too
+    KITTY_PUSH = "\x1b[>9u"
+    KITTY_POP = "\x1b[<u"
+    CTRL = 4
+    # kitty's private-use codes (keypad, modifiers, media) start here
+    FUNCTIONAL = 57344
+    # media keys as reported by the kitty/foot keyboard protocol: CSI <code> u
+    MEDIA = {
+        57428: "play_pause", 57429: "play_pause", 57430: "play_pause",
+        57433: "right", 57434: "left",
+        57435: "next", 57436: "prev",
+        57438: "volume_down", 57439: "volume_up", 57440: "mute",
+    }
+    ESCAPE = re.compile(rb"\x1b(?:\[([0-9;:]*)([\x40-\x7e])|O([A-D]))")
+    PARTIAL = re.compile(rb"\x1b(?:\[[0-9;:]*|O)?")
+    ESCAPE_WAIT = 0.05
+
+    def __init__(self, on_key: Callable[[str], None]):
+        self.on_key = on_key
+        self.loop: Optional[asyncio.AbstractEventLoop] = None
+        self.fd = -1
+        self._old_settings = None
+        self._buf = b""
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+        self._kitty = False
+
+    def start(self, loop: asyncio.AbstractEventLoop):
+        try:
+            self.fd = sys.stdin.fileno()
+            self._old_settings = termios.tcgetattr(self.fd)
+            tty.setcbreak(self.fd)
+        except (OSError, ValueError, termios.error):
+            self._old_settings = None
+            return
+        loop.add_reader(self.fd, self._on_readable)
+        self.loop = loop
+        self._set_kitty(True)
+
     def stop(self):
-        
-        self.running = False
-    
-    def _listen(self):
-      
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self.loop:
+            self.loop.remove_reader(self.fd)
+            self.loop = None
+        self._set_kitty(False)
+        if self._old_settings is not None:
+            termios.tcsetattr(self.fd, termios.TCSADRAIN, self._old_settings)
+            self._old_settings = None
+
+    def _set_kitty(self, on: bool):
+        if on == self._kitty or not sys.stdout.isatty():
+            return
+        sys.stdout.write(self.KITTY_PUSH if on else self.KITTY_POP)
+        sys.stdout.flush()
+        self._kitty = on
+
+    def _plain(self, code: int) -> str:
+        return self.NAMES.get(code) or chr(code).lower()
+
+    def _csi_u(self, params: bytes) -> Optional[str]:
+        """A key in CSI <code>[:alternates][;modifiers[:event]] u form"""
+        fields = params.split(b";")
+        code = fields[0].split(b":")[0]
+        mods = fields[1].split(b":")[0] if len(fields) > 1 else b"1"
+        if not code.isdigit() or not mods.isdigit():
+            return None
+        code, mods = int(code), int(mods) - 1
+        if code in self.MEDIA:
+            return self.MEDIA[code]
+        if code >= self.FUNCTIONAL:
+            return None
+        if mods & self.CTRL and ord("a") <= code <= ord("z"):
+            if code == ord("c"):
+                # the terminal no longer turns Ctrl+C into SIGINT in this mode
+                os.kill(os.getpid(), signal.SIGINT)
+                return None
+            code &= 0x1f
+        return self._plain(code)
+
+    def _on_readable(self):
         try:
-            
-            old_settings = termios.tcgetattr(sys.stdin)
+            data = os.read(self.fd, 64)
+        except OSError:
+            return
+        if self._flush_timer:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        self._buf += data
+        for key in self._decode(final=False):
+            self.on_key(key)
+        if self._buf and self.loop:
+            # a lone ESC, or a sequence split across reads; give it a moment
+            self._flush_timer = self.loop.call_later(self.ESCAPE_WAIT, self._flush)
+
+    def _flush(self):
+        self._flush_timer = None
+        for key in self._decode(final=True):
+            self.on_key(key)
+
+    def _decode(self, final: bool) -> List[str]:
+        keys: List[str] = []
+        buf = self._buf
+        while buf:
+            if buf[0] != 0x1b:
+                keys.append(self._plain(buf[0]))
+                buf = buf[1:]
+                continue
+            m = self.ESCAPE.match(buf)
+            if m is None:
+                if not final and self.PARTIAL.fullmatch(buf):
+                    break
+                keys.append("escape")
+                buf = buf[1:]
+                continue
+            params, final_byte, ss3 = m.groups()
+            if ss3:
+                keys.append(self.ARROWS[ss3.decode()])
+            elif final_byte.decode() in self.ARROWS:
+                keys.append(self.ARROWS[final_byte.decode()])
+            elif final_byte == b"u" and params:
+                name = self._csi_u(params)
+                if name:
+                    keys.append(name)
+            buf = buf[m.end():]
+        self._buf = buf
+        return keys
+
+
+# MPV IPC Client
+class MPVClient:
+    """Long-lived JSON IPC connection to a single mpv process.
+
+    Commands are tagged with a request_id and replies are matched on a
+    reader thread, so several requests can be in flight at once.
+    """
+
+    def __init__(self, sock_path: str):
+        self.sock_path = sock_path
+        self.sock: Optional[socket.socket] = None
+        self.event_handlers: List[Callable[[dict], None]] = []
+        self._pending: Dict[int, Future] = {}
+        self._next_id = 1
+        self._lock = threading.Lock()
+        self._reader: Optional[threading.Thread] = None
+
+    def connect(self) -> bool:
+        try:
+            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            s.connect(self.sock_path)
+        except Exception:
+            return False
+        self.sock = s
+        self._reader = threading.Thread(target=self._read_loop, daemon=True)
+        self._reader.start()
+        return True
+
+    def close(self):
+        s, self.sock = self.sock, None
+        if s:
             try:
-                tty.setcbreak(sys.stdin.fileno())
-                while self.running:
-                    if sys.stdin in select.select([sys.stdin], [], [], 0.1)[0]:
-                        ch = sys.stdin.read(1)
-                        
-                        if ord(ch) == 23:
-                            self.key_pressed = 'ctrl_w'
-            finally:
-                termios.tcsetattr(sys.stdin, termios.TCSADRAIN, old_settings)
-        except:
-            pass
-    
-    def get_key(self):
-        
-        key = self.key_pressed
-        self.key_pressed = None
-        return key
+                s.shutdown(socket.SHUT_RDWR)
+            except Exception:
+                pass
+            s.close()
+        self._fail_pending()
+
+    @property
+    def connected(self) -> bool:
+        return self.sock is not None
+
+    def request(self, *args) -> Future:
+        """Send a command without waiting; the future resolves to mpv's reply (or None)"""
+        fut: Future = Future()
+        with self._lock:
+            if not self.sock:
+                fut.set_result(None)
+                return fut
+            req_id = self._next_id
+            self._next_id += 1
+            self._pending[req_id] = fut
+            try:
+                payload = json.dumps({"command": list(args), "request_id": req_id})
+                self.sock.sendall(payload.encode("utf-8") + b"\n")
+            except Exception:
+                self._pending.pop(req_id, None)
+                fut.set_result(None)
+        return fut
+
+    def command(self, *args, timeout: float = 0.5) -> Optional[dict]:
+        try:
+            return self.request(*args).result(timeout=timeout)
+        except Exception:
+            return None
+
+    def _read_loop(self):
+        buf = b""
+        sock = self.sock
+        while sock is not None and self.sock is sock:
+            try:
+                chunk = sock.recv(65536)
+            except Exception:
+                break
+            if not chunk:
+                break
+            buf += chunk
+            *lines, buf = buf.split(b"\n")
+            for line in lines:
+                # replies always carry request_id; skip parsing events nobody listens to
+                is_reply = b'"request_id"' in line
+                if not is_reply and not self.event_handlers:
+                    continue
+                try:
+                    msg = json.loads(line)
+                except Exception:
+                    continue
+                req_id = msg.get("request_id")
+                if req_id is not None and "event" not in msg:
+                    with self._lock:
+                        fut = self._pending.pop(req_id, None)
+                    if fut and not fut.done():
+                        fut.set_result(msg)
+                elif "event" in msg:
+                    for handler in list(self.event_handlers):
+                        try:
+                            handler(msg)
+                        except Exception:
+                            pass
+        if self.sock is sock:
+            self.sock = None
+        self._fail_pending()
+        for handler in list(self.event_handlers):
+            try:
+                handler({"event": "ipc-closed"})
+            except Exception:
+                pass
 
+    def _fail_pending(self):
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        for fut in pending.values():
+            if not fut.done():
+                fut.set_result(None)
 
 
 # MPV IPC Player 
+@dataclass
+class PlaybackState:
+    time_pos: float = 0.0
+    duration: float = 0.0
+    pause: bool = False
+    eof_reached: bool = False
+    idle_active: bool = False
+    playlist_pos: int = -1
+    paused_for_cache: bool = False
+
+
+@dataclass
+class MPVStartup:
+    """How long the last mpv spawn took to answer on its IPC socket"""
+    attempts: int = 0
+    connected: float = 0.0
+    ready: float = 0.0
+    error: str = ""
+
+    def __str__(self) -> str:
+        if self.error:
+            return f"mpv failed to start: {self.error}"
+        return f"mpv ready in {self.ready * 1000:.0f} ms ({self.attempts} attempts)"
+
+
 class MPVPlayer:
+    OBSERVED = ["time-pos", "duration", "pause", "eof-reached", "idle-active", "playlist-pos", "paused-for-cache"]
+    READY_TIMEOUT = 5.0
+    _sock_ids = itertools.count(1)
+
     def __init__(self):
         self.proc: Optional[subprocess.Popen] = None
         self.sock_path: Optional[str] = None
+        self.ipc: Optional[MPVClient] = None
+        self.startup = MPVStartup()
+        self.playlist_count = 0
+        self.state = PlaybackState()
+        self._state_lock = threading.Lock()
+        self._time_stamp: Optional[float] = None
+        self._watchers: List[Callable[[], None]] = []
+        self.seek_count = 0
 
     def play(self, url: str):
+        self._spawn([url])
+
+    def start_playlist(self, url: str):
+        """Keep one mpv alive for a whole playlist; later tracks go in with queue()"""
+        self._spawn([
+            "--idle=yes",
+            "--gapless-audio=yes",
+            "--prefetch-playlist=yes",
+            url,
+        ])
+
+    def queue(self, url: str):
+        if self.ipc:
+            self.ipc.request("loadfile", url, "append")
+            self.playlist_count += 1
+
+    def play_index(self, index: int):
+        if self.ipc:
+            self.ipc.request("playlist-play-index", index)
+
+    def _spawn(self, args: List[str]):
         self.stop()
+        self.playlist_count = 1
 
-        cache_dir = os.path.join(os.path.expanduser("~"), ".cache")
-        os.makedirs(cache_dir, exist_ok=True)
-        self.sock_path = os.path.join(cache_dir, f"mpv-sock-{os.getpid()}")
+        os.makedirs(CACHE_DIR, exist_ok=True)
+        # unique per spawn so several players (or a quick respawn) never share a socket
+        self.sock_path = os.path.join(CACHE_DIR, f"mpv-sock-{os.getpid()}-{next(self._sock_ids)}")
 
         try:
             os.remove(self.sock_path)
@@ -89,21 +387,60 @@ class MPVPlayer:
             "mpv",
             "--no-video",
             "--quiet",
+            "--no-input-terminal",
             "--ytdl=yes",
             "--ytdl-format=bestaudio[ext=m4a]/bestaudio/best",
             f"--input-ipc-server={self.sock_path}",
-            url,
+            *args,
         ]
 
-        self.proc = subprocess.Popen(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
-
-        # wait socket
-        for _ in range(60):
-            if os.path.exists(self.sock_path):
-                break
-            time.sleep(0.05)
+        self.proc = subprocess.Popen(cmd, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+        self._reset_state()
+        self.ipc = MPVClient(self.sock_path)
+        self.ipc.event_handlers.append(self._on_event)
+        if self._wait_ready():
+            for obs_id, name in enumerate(self.OBSERVED, 1):
+                self.ipc.request("observe_property", obs_id, name)
+
+    def _wait_ready(self) -> bool:
+        """Connect with backoff until mpv answers a command, or give up if it exits.
+
+        The socket file can appear before mpv accepts connections, so only a
+        reply counts. The backoff sleep is a wait on the process, which makes
+        an early exit end the handshake at once.
+        """
+        start = time.monotonic()
+        self.startup = MPVStartup()
+        delay = 0.005
+        while True:
+            self.startup.attempts += 1
+            if self.ipc.connected or self.ipc.connect():
+                if not self.startup.connected:
+                    self.startup.connected = time.monotonic() - start
+                resp = self.ipc.command("client_name", timeout=1.0)
+                if resp and resp.get("error") == "success":
+                    self.startup.ready = time.monotonic() - start
+                    return True
+
+            remaining = self.READY_TIMEOUT - (time.monotonic() - start)
+            if remaining <= 0:
+                self.startup.error = f"no IPC reply after {self.READY_TIMEOUT:.0f} s"
+                return False
+            try:
+                code = self.proc.wait(timeout=min(delay, remaining))
+            except subprocess.TimeoutExpired:
+                delay = min(delay * 2, 0.2)
+                continue
+            self.startup.error = f"exited with code {code}"
+            return False
 
     def stop(self):
+        if self.ipc:
+            self.ipc.close()
+        self.ipc = None
+        self._notify()
+
         if self.proc and self.proc.poll() is None:
             try:
                 self.proc.terminate()
@@ -121,162 +458,994 @@ class MPVPlayer:
     def is_playing(self) -> bool:
         return self.proc is not None and self.proc.poll() is None
 
-    def _send(self, payload: dict) -> Optional[dict]:
-        if not self.sock_path or not os.path.exists(self.sock_path):
+    def command(self, *args) -> Future:
+        """Send a command without waiting, resolves to mpv's reply"""
+        if not self.ipc:
+            fut: Future = Future()
+            fut.set_result(None)
+            return fut
+        return self.ipc.request(*args)
+
+    def add_watcher(self, callback: Callable[[], None]):
+        """Call `callback` (from the IPC thread) whenever the observed state changes"""
+        self._watchers.append(callback)
+
+    def remove_watcher(self, callback: Callable[[], None]):
+        if callback in self._watchers:
+            self._watchers.remove(callback)
+
+    def _reset_state(self):
+        with self._state_lock:
+            self.state = PlaybackState()
+            self._time_stamp = None
+        self._notify()
+
+    def _notify(self):
+        for callback in list(self._watchers):
+            callback()
+
+    def _on_event(self, msg: dict):
+        event = msg.get("event")
+        if event == "seek":
+            self.seek_count += 1
+        if event in ("seek", "playback-restart", "ipc-closed"):
+            self._notify()
+            return
+        if event != "property-change":
+            return
+        attr = (msg.get("name") or "").replace("-", "_")
+        if not hasattr(self.state, attr):
+            return
+        value = msg.get("data")
+        if attr == "time_pos":
+            # continuous: refresh the clock without waking anyone (seeks notify above)
+            with self._state_lock:
+                self.state.time_pos = float(value or 0.0)
+                self._time_stamp = time.monotonic()
+            return
+        with self._state_lock:
+            if attr == "duration":
+                value = float(value or 0.0)
+            elif attr == "playlist_pos":
+                value = int(value if value is not None else -1)
+            else:
+                value = bool(value)
+            if getattr(self.state, attr) == value:
+                return
+            setattr(self.state, attr, value)
+            if attr == "playlist_pos":
+                # the next entry's values arrive separately; don't show the last file's
+                self.state.time_pos = 0.0
+                self.state.duration = 0.0
+                self._time_stamp = None
+            elif attr in ("pause", "paused_for_cache"):
+                # the clock stands still while paused or buffering; restart it from here
+                self._time_stamp = time.monotonic()
+        self._notify()
+
+    def finished(self, entry: Optional[int] = None) -> bool:
+        """True once the current file (or playlist `entry`) is over"""
+        if not self.is_playing():
+            return True
+        if entry is None:
+            return self.state.eof_reached
+        pos = self.state.playlist_pos
+        if pos == -1:
+            return self.state.idle_active
+        # moved on, or back (playlist-prev)
+        return pos != entry
+
+    def stream_url(self) -> Optional[str]:
+        """The media URL mpv actually opened (after ytdl resolution), if it is directly readable"""
+        if not self.ipc:
             return None
+        for prop in ("stream-open-filename", "path"):
+            resp = self.ipc.command("get_property", prop)
+            url = resp.get("data") if resp and resp.get("error") == "success" else None
+            if not url or url.startswith(("edl://", "ytdl://")) or "youtube.com/watch" in url:
+                continue
+            return url
+        return None
+
+    # snapshot reads, kept up to date by observe_property
+    def time_pos(self) -> float:
+        """Playback position, extrapolated from the last time-pos update"""
+        st = self.state
+        if st.pause or st.paused_for_cache or st.idle_active or self._time_stamp is None:
+            return st.time_pos
+        t = st.time_pos + time.monotonic() - self._time_stamp
+        return min(t, st.duration) if st.duration > 0 else t
+
+    def duration(self) -> float:
+        return self.state.duration
+
+
+
+# Audio Analysis
+class AudioAnalyzer:
+    """Band energies of the playing stream, computed off the render thread.
+
+    A second, low-priority ffmpeg decodes the same stream to mono PCM. A
+    worker runs a windowed FFT per hop and pushes (media time, bands) into
+    a ring buffer. The worker never gets more than `lookahead` seconds
+    ahead of the playhead: it stops reading and ffmpeg blocks on the full
+    pipe, so the CPU cost stays at one FFT per hop.
+
+    ffmpeg is only restarted when `seeks()` (mpv's seek counter) changes.
+    Falling behind, e.g. while a slow stream opens, is made up by reading
+    PCM without analysing it rather than by reconnecting.
+    """
+
+    SAMPLE_RATE = 22050
+    WINDOW = 2048
+    HOP = 1024
+    DB_RANGE = 45.0
+
+    def __init__(self, clock: Callable[[], float], seeks: Callable[[], int] = lambda: 0, bands: int = 16, lookahead: float = 2.0):
+        self.clock = clock
+        self.seeks = seeks
+        self.bands = bands
+        self.lookahead = lookahead
+        self.ring: deque = deque(maxlen=int((lookahead + 2) * self.SAMPLE_RATE / self.HOP))
+        self.proc: Optional[subprocess.Popen] = None
+        self._stop = threading.Event()
+        self._lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        # log-spaced bands between 40 Hz and 10 kHz, as rfft bin offsets for reduceat
+        freqs = np.geomspace(40, 10000, bands + 1)
+        bins = (freqs * self.WINDOW / self.SAMPLE_RATE).astype(int)
+        steps = np.arange(bands + 1)
+        # at least one bin per band, even where log spacing is finer than the FFT
+        self.edges = np.maximum.accumulate(bins - steps) + steps
+        self.window = np.hanning(self.WINDOW).astype(np.float32)
+        self.peaks = np.full(bands, -90.0)
+
+    @staticmethod
+    def available() -> bool:
+        return np is not None and shutil.which("ffmpeg") is not None
+
+    def start(self, source: str):
+        self.stop()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(source,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._kill()
+        with self._lock:
+            self.ring.clear()
+
+    def bands_at(self, t: float) -> Optional[List[float]]:
+        """Most recent analysis at or before media time t"""
+        with self._lock:
+            for stamp, levels in reversed(self.ring):
+                if stamp <= t:
+                    return levels
+        return None
+
+    def _spawn(self, source: str, offset: float):
+        self._kill()
+        cmd = [
+            "ffmpeg", "-nostdin", "-v", "error", "-threads", "1",
+            "-ss", f"{offset:.3f}", "-i", source,
+            "-vn", "-ac", "1", "-ar", str(self.SAMPLE_RATE), "-f", "s16le", "pipe:1",
+        ]
+        self.proc = subprocess.Popen(cmd, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        # renice from outside: preexec_fn is unsafe in a process with threads
         try:
-            s = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
-            s.settimeout(0.5)
-            s.connect(self.sock_path)
-            s.sendall((json.dumps(payload) + "\n").encode("utf-8"))
+            os.setpriority(os.PRIO_PROCESS, self.proc.pid, 10)
+        except (AttributeError, OSError):
+            pass
 
-            data = b""
-            while True:
-                chunk = s.recv(4096)
-                if not chunk:
-                    break
-                data += chunk
-                if b"\n" in data:
-                    break
+    def _kill(self):
+        if self.proc and self.proc.poll() is None:
+            try:
+                self.proc.kill()
+            except Exception:
+                pass
+        self.proc = None
 
-            s.close()
-            line = data.split(b"\n", 1)[0].decode("utf-8", errors="ignore")
-            return json.loads(line)
-        except Exception:
-            return None
+    def _run(self, source: str):
+        hop_s = self.HOP / self.SAMPLE_RATE
+        media_t = max(0.0, self.clock())
+        samples = np.zeros(self.WINDOW, dtype=np.float32)
+        seen_seeks = self.seeks()
+        self._spawn(source, media_t)
+
+        while not self._stop.is_set():
+            playhead = self.clock()
+            if self.seeks() != seen_seeks:
+                # the user seeked: restart decoding at the new position
+                seen_seeks = self.seeks()
+                media_t = playhead
+                samples[:] = 0
+                with self._lock:
+                    self.ring.clear()
+                self._spawn(source, media_t)
+            if media_t - playhead > self.lookahead:
+                self._stop.wait(hop_s)
+                continue
 
-    def time_pos(self) -> float:
-        resp = self._send({"command": ["get_property", "time-pos"]})
-        if not resp or resp.get("error") != "success":
-            return 0.0
+            proc = self.proc
+            data = proc.stdout.read(self.HOP * 2) if proc else b""
+            if len(data) < self.HOP * 2:
+                # end of stream (or ffmpeg failed); keep last values until stopped
+                self._stop.wait(0.5)
+                continue
+
+            if playhead - media_t > 0.5:
+                # behind the playhead: skip the FFT until caught up
+                media_t += hop_s
+                continue
+
+            samples = np.roll(samples, -self.HOP)
+            samples[-self.HOP:] = np.frombuffer(data, dtype="<i2") / 32768.0
+            power = np.abs(np.fft.rfft(samples * self.window)) ** 2
+            energy = np.add.reduceat(power, self.edges[:-1]) / np.diff(self.edges)
+            db = 10 * np.log10(energy + 1e-12)
+            # slowly decaying per-band peak keeps levels in 0..1 without a fixed gain
+            self.peaks = np.maximum(db, self.peaks - 0.05)
+            levels = np.clip((db - (self.peaks - self.DB_RANGE)) / self.DB_RANGE, 0.0, 1.0)
+
+            media_t += hop_s
+            with self._lock:
+                self.ring.append((media_t - self.WINDOW / 2 / self.SAMPLE_RATE, levels.tolist()))
+
+        self._kill()
+
+
+# Disk Cache
+class DiskCache:
+    """SQLite key/value store with per-entry expiry and an LRU size cap"""
+
+    def __init__(self, path: str, max_bytes: int):
+        self.path = path
+        self.max_bytes = max_bytes
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+
+    def _conn(self) -> sqlite3.Connection:
+        if self._db is None:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            db = sqlite3.connect(self.path, check_same_thread=False)
+            db.execute(
+                "CREATE TABLE IF NOT EXISTS entries ("
+                "key TEXT PRIMARY KEY, value TEXT, stored REAL, expires REAL, accessed REAL, size INTEGER)"
+            )
+            db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries(accessed)")
+            self._db = db
+        return self._db
+
+    def get(self, key: str, allow_expired: bool = False):
+        """Return (value, stored_at, expires_at) or None"""
+        now = time.time()
         try:
-            return float(resp.get("data") or 0.0)
-        except Exception:
-            return 0.0
+            with self._lock:
+                db = self._conn()
+                row = db.execute(
+                    "SELECT value, stored, expires FROM entries WHERE key = ?", (key,)
+                ).fetchone()
+                if not row:
+                    return None
+                if row[2] < now and not allow_expired:
+                    return None
+                db.execute("UPDATE entries SET accessed = ? WHERE key = ?", (now, key))
+                db.commit()
+            return json.loads(row[0]), row[1], row[2]
+        except (sqlite3.Error, OSError, ValueError):
+            return None
 
-    def duration(self) -> float:
-        resp = self._send({"command": ["get_property", "duration"]})
-        if not resp or resp.get("error") != "success":
-            return 0.0
+    def put(self, key: str, value, ttl: float):
+        now = time.time()
+        data = json.dumps(value, separators=(",", ":"))
         try:
-            return float(resp.get("data") or 0.0)
-        except Exception:
-            return 0.0
+            with self._lock:
+                db = self._conn()
+                db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?)",
+                    (key, data, now, now + ttl, now, len(data)),
+                )
+                self._evict(db)
+                db.commit()
+        except (sqlite3.Error, OSError):
+            pass
 
+    def _evict(self, db: sqlite3.Connection):
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # drop expired entries first, then least recently used
+        db.execute("DELETE FROM entries WHERE expires < ?", (time.time(),))
+        total = db.execute("SELECT COALESCE(SUM(size), 0) FROM entries").fetchone()[0]
+        for key, size in db.execute("SELECT key, size FROM entries ORDER BY accessed").fetchall():
+            if total <= self.max_bytes:
+                break
+            db.execute("DELETE FROM entries WHERE key = ?", (key,))
+            total -= size
 
 
-# Lyrics Sync
-@dataclass
-class LrcLine:
-    time: float
-    text: str
+class LyricsCache:
+    """Parsed lyrics keyed by videoId and normalized track/artist/album"""
 
+    FOUND_TTL = 30 * 24 * 3600
+    MISSING_TTL = 24 * 3600
 
-class LyricsSync:
-    def __init__(self):
-        self.lines: List[LrcLine] = []
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 32 * 1024 * 1024, offline: bool = False):
+        self.store = DiskCache(path or os.path.join(CACHE_DIR, "ytm-lyrics.sqlite3"), max_bytes)
+        self.offline = offline
 
-    def fetch_lyrics(self, track_name: str, artist_name: str, album_name: str = "") -> bool:
-        # lrclib.net exact match
-        try:
-            console.print("[cyan]Fetching lyrics from lrclib...[/cyan]")
-            url = "https://lrclib.net/api/get"
-            params = {
-                "track_name": track_name,
-                "artist_name": artist_name,
-            }
-            if album_name:
-                params["album_name"] = album_name
-            
-            r = requests.get(url, params=params, timeout=10)
-            if r.status_code == 200:
-                data = r.json()
-                synced = data.get("syncedLyrics")
-                if synced:
-                    console.print("[green]✓ Found synced lyrics[/green]")
-                    self.lines = self._parse_lrc(synced)
-                    return len(self.lines) > 0
-        except Exception as e:
-            console.print(f"[yellow]lrclib failed: {e}[/yellow]")
+    @staticmethod
+    def _norm(value: str) -> str:
+        value = re.sub(r"[^\w\s]", " ", (value or "").casefold())
+        return " ".join(value.split())
 
-        # Fallback: lrclib search
-        try:
-            console.print("[cyan]Trying lrclib search...[/cyan]")
-            url = "https://lrclib.net/api/search"
-            params = {
-                "q": f"{artist_name} {track_name}",
+    def _keys(self, video_id: str, track: str, artist: str, album: str) -> List[str]:
+        keys = [f"meta:{self._norm(track)}|{self._norm(artist)}|{self._norm(album)}"]
+        if video_id:
+            keys.insert(0, f"vid:{video_id}")
+        return keys
+
+    def lookup(self, video_id: str, track: str, artist: str, album: str = "") -> Optional["LrcLines"]:
+        """Cached lyrics (empty for a remembered miss), or None when unknown"""
+        for key in self._keys(video_id, track, artist, album):
+            hit = self.store.get(key, allow_expired=self.offline)
+            if hit is not None:
+                return LrcLines.from_rows(hit[0])
+        return None
+
+    def save(self, video_id: str, track: str, artist: str, album: str, lines: "LrcLines"):
+        value = lines.rows()
+        ttl = self.FOUND_TTL if value else self.MISSING_TTL
+        for key in self._keys(video_id, track, artist, album):
+            self.store.put(key, value, ttl)
+
+
+class MetadataCache:
+    """ytmusicapi responses with per-endpoint TTLs and stale-while-revalidate.
+
+    Within `fresh` seconds a response is served as is. Until `stale` it is
+    still served instantly, and a background refresh replaces it (or it is
+    refreshed inline when stale_while_revalidate is off).
+    """
+
+    TTLS = {
+        "search": {"fresh": 3600, "stale": 7 * 24 * 3600},
+        "get_playlist": {"fresh": 600, "stale": 24 * 3600},
+    }
+
+    def __init__(self, path: Optional[str] = None, max_bytes: int = 64 * 1024 * 1024,
+                 offline: bool = False, stale_while_revalidate: bool = True):
+        self.store = DiskCache(path or os.path.join(CACHE_DIR, "ytm-meta.sqlite3"), max_bytes)
+        self.offline = offline
+        self.stale_while_revalidate = stale_while_revalidate
+        self._refreshing: set = set()
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=2)
+
+    def call(self, endpoint: str, fn: Callable, *args, **kwargs):
+        key = f"{endpoint}:" + json.dumps([args, kwargs], sort_keys=True, default=str)
+        ttl = self.TTLS[endpoint]
+        hit = self.store.get(key, allow_expired=self.offline)
+        if hit is not None:
+            value, stored, _ = hit
+            if self.offline or time.time() - stored < ttl["fresh"]:
+                return value
+            if self.stale_while_revalidate:
+                self._refresh_later(key, ttl["stale"], fn, args, kwargs)
+                return value
+        elif self.offline:
+            raise LookupError("offline and not cached")
+
+        value = fn(*args, **kwargs)
+        self.store.put(key, value, ttl["stale"])
+        return value
+
+    def _refresh_later(self, key: str, ttl: float, fn: Callable, args, kwargs):
+        with self._lock:
+            if key in self._refreshing:
+                return
+            self._refreshing.add(key)
+
+        def refresh():
+            try:
+                self.store.put(key, fn(*args, **kwargs), ttl)
+            except Exception:
+                pass
+            finally:
+                with self._lock:
+                    self._refreshing.discard(key)
+
+        self._pool.submit(refresh)
+
+
+class CachedYTMusic:
+    """YTMusic with search and get_playlist answered from MetadataCache"""
+
+    def __init__(self, ytmusic: YTMusic, cache: MetadataCache):
+        self._ytmusic = ytmusic
+        self.cache = cache
+
+    def search(self, *args, **kwargs):
+        return self.cache.call("search", self._ytmusic.search, *args, **kwargs)
+
+    def get_playlist(self, *args, **kwargs):
+        return self.cache.call("get_playlist", self._ytmusic.get_playlist, *args, **kwargs)
+
+    def __getattr__(self, name):
+        return getattr(self._ytmusic, name)
+
+
+# lrclib Client
+class RateLimiter:
+    """Token bucket; acquire() blocks until a request may go out"""
+
+    def __init__(self, rate: float, burst: int):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                delay = (1 - self.tokens) / self.rate
+            time.sleep(delay)
+
+
+class LrclibClient:
+    """Keep-alive lrclib session; exact and search lookups share one deadline"""
+
+    BASE_URL = "https://lrclib.net/api"
+    _shared: Optional["LrclibClient"] = None
+
+    def __init__(self, race: bool = True, deadline: float = 8.0, pool_size: int = 6, rate: float = 4.0):
+        self.race = race
+        self.deadline = deadline
+        self.limiter = RateLimiter(rate, burst=8)
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount("https://", adapter)
+        self.session.headers["User-Agent"] = "generaltools-ytm (https://github.com/debojitsantra/generaltools)"
+        self._pool = ThreadPoolExecutor(max_workers=pool_size)
+
+    @classmethod
+    def shared(cls) -> "LrclibClient":
+        if cls._shared is None:
+            cls._shared = cls()
+        return cls._shared
+
+    def _exact(self, track: str, artist: str, album: str, timeout: float) -> Optional[str]:
+        params = {"track_name": track, "artist_name": artist}
+        if album:
+            params["album_name"] = album
+        self.limiter.acquire()
+        r = self.session.get(f"{self.BASE_URL}/get", params=params, timeout=timeout)
+        if r.status_code == 404:
+            return None
+        if r.status_code != 200:
+            raise LookupError(f"HTTP {r.status_code}")
+        return r.json().get("syncedLyrics") or None
+
+    def _search(self, track: str, artist: str, album: str, timeout: float) -> Optional[str]:
+        self.limiter.acquire()
+        r = self.session.get(f"{self.BASE_URL}/search", params={"q": f"{artist} {track}"}, timeout=timeout)
+        if r.status_code != 200:
+            raise LookupError(f"HTTP {r.status_code}")
+        for result in r.json() or []:
+            if result.get("syncedLyrics"):
+                return result["syncedLyrics"]
+        return None
+
+    def find_synced(self, track: str, artist: str, album: str = "", abort: Optional[Future] = None,
+                    race: Optional[bool] = None):
+        """Return (lrc_text, source, complete, errors); complete means every lookup answered.
+
+        Resolving `abort` gives up at once; lookups still in flight finish
+        in the background and are ignored. `race` overrides the client's
+        default: racing always sends both requests, so keep it for lookups
+        someone is waiting on.
+        """
+        end = time.monotonic() + self.deadline
+        lookups = {"exact": self._exact, "search": self._search}
+        errors: List[str] = []
+        answered = 0
+
+        if self.race if race is None else race:
+            futures = {
+                self._pool.submit(fn, track, artist, album, self.deadline): name
+                for name, fn in lookups.items()
             }
-            
-            r = requests.get(url, params=params, timeout=10)
-            if r.status_code == 200:
-                results = r.json()
-                if results and len(results) > 0:
-                    synced = results[0].get("syncedLyrics")
+            pending = set(futures)
+            while pending:
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    errors.append("deadline exceeded")
+                    break
+                watching = pending | {abort} if abort else pending
+                done, _ = wait(watching, timeout=remaining, return_when=FIRST_COMPLETED)
+                if abort and abort.done():
+                    errors.append("cancelled")
+                    break
+                pending -= done
+                for fut in done:
+                    try:
+                        synced = fut.result()
+                    except Exception as e:
+                        errors.append(f"{futures[fut]}: {e}")
+                        continue
+                    answered += 1
                     if synced:
-                        console.print("[green]✓ Found via search[/green]")
-                        self.lines = self._parse_lrc(synced)
-                        return len(self.lines) > 0
-        except Exception as e:
-            console.print(f"[yellow]Search failed: {e}[/yellow]")
+                        return synced, futures[fut], True, errors
+        else:
+            for name, fn in lookups.items():
+                remaining = end - time.monotonic()
+                if remaining <= 0:
+                    errors.append("deadline exceeded")
+                    break
+                if abort and abort.done():
+                    errors.append("cancelled")
+                    break
+                try:
+                    synced = fn(track, artist, album, remaining)
+                except Exception as e:
+                    errors.append(f"{name}: {e}")
+                    continue
+                answered += 1
+                if synced:
+                    return synced, name, True, errors
 
-        console.print("[red]✗ No synced lyrics found[/red]")
-        return False
+        return None, "", answered == len(lookups), errors
+
+
+# Lyrics Sync
+WordTimes = Optional[List[Tuple[float, str]]]
+
+
+class LrcLines(NamedTuple):
+    """Parsed lyrics as parallel arrays sorted by time"""
+
+    times: array
+    texts: List[str]
+    # enhanced LRC: (start time, segment) per word, segments join back into the text
+    words: List[WordTimes]
+
+    @classmethod
+    def empty(cls) -> "LrcLines":
+        return cls(array("d"), [], [])
 
-    def _parse_lrc(self, synced_lyrics: str) -> List[LrcLine]:
-        """Parse standard LRC format"""
-        out: List[LrcLine] = []
-        for line in synced_lyrics.strip().split("\n"):
-            line = line.strip()
-            if not line.startswith("[") or "]" not in line:
+    @classmethod
+    def from_rows(cls, rows: list) -> "LrcLines":
+        return cls(
+            array("d", [row[0] for row in rows]),
+            [row[1] for row in rows],
+            [row[2] if len(row) > 2 else None for row in rows],
+        )
+
+    def rows(self) -> list:
+        return [list(row) for row in zip(self.times, self.texts, self.words)]
+
+
+@dataclass
+class LyricPosition:
+    index: int  # -1 before the first line
+    text: str
+    next_time: Optional[float]  # when the line or highlighted word changes next
+    word: int = -1
+    sung: int = 0  # characters of text already sung (enhanced LRC)
+
+
+class LyricsSync:
+    STAMP = re.compile(r"\[(\d+):(\d+)(?:[.:](\d+))?\]")
+    LINE = re.compile(r"^[ \t]*\[(\d+):(\d+)(?:[.:](\d+))?\]((?:\[\d+:\d+(?:[.:]\d+)?\])*)(.*)", re.MULTILINE)
+    OFFSET = re.compile(r"^\s*\[offset:\s*([+-]?\d+)\s*\]", re.IGNORECASE | re.MULTILINE)
+    WORD_TAG = re.compile(r"<(\d+):(\d+(?:\.\d+)?)>")
+
+    def __init__(self, cache: Optional[LyricsCache] = None, client: Optional[LrclibClient] = None):
+        self.lines = LrcLines.empty()
+        self.cache = cache
+        self.client = client or LrclibClient.shared()
+        # False when a lookup failed or was cut short, so "no lyrics" isn't final
+        self.complete = True
+
+    def __len__(self) -> int:
+        return len(self._lines.texts)
+
+    @property
+    def lines(self) -> LrcLines:
+        return self._lines
+
+    @lines.setter
+    def lines(self, lines: LrcLines):
+        self._lines = lines
+        self._cursor = -1
+
+    def fetch_lyrics(self, track_name: str, artist_name: str, album_name: str = "", verbose: bool = True, video_id: str = "", abort: Optional[Future] = None, race: Optional[bool] = None) -> bool:
+        log = console.print if verbose else (lambda *a, **k: None)
+
+        if self.cache:
+            cached = self.cache.lookup(video_id, track_name, artist_name, album_name)
+            if cached is not None:
+                self.lines = cached
+                return len(self) > 0
+            if self.cache.offline:
+                log("[yellow]Offline: no cached lyrics[/yellow]")
+                return False
+
+        found = self._fetch_remote(track_name, artist_name, album_name, log, abort, race)
+        self.complete = found is not None
+        if found is not None and self.cache:
+            self.cache.save(video_id, track_name, artist_name, album_name, found)
+        self.lines = found or LrcLines.empty()
+        return len(self) > 0
+
+    def _fetch_remote(self, track_name: str, artist_name: str, album_name: str, log, abort: Optional[Future] = None, race: Optional[bool] = None) -> Optional[LrcLines]:
+        """Parsed lines, [] when lrclib has none, or None if a lookup failed"""
+        log("[cyan]Fetching lyrics from lrclib...[/cyan]")
+        synced, source, complete, errors = self.client.find_synced(track_name, artist_name, album_name, abort, race)
+        for err in errors:
+            log(f"[yellow]lrclib {err}[/yellow]")
+        if synced:
+            log(f"[green]✓ Found synced lyrics ({source})[/green]")
+            return self._parse_lrc(synced)
+
+        log("[red]✗ No synced lyrics found[/red]")
+        # only remember a miss when both lookups actually answered
+        return LrcLines.empty() if complete else None
+
+    @classmethod
+    def _parse_lrc(cls, synced_lyrics: str) -> LrcLines:
+        """Parse LRC in one pass: multi-timestamp lines, [offset:] and enhanced word tags"""
+        times: List[float] = []
+        texts: List[str] = []
+        words: List[WordTimes] = []
+
+        # the line regex walks the whole text in C; metadata tags like [ar:] never match it
+        for mm, ss, frac, more_stamps, text in cls.LINE.findall(synced_lyrics):
+            text = text.strip()
+            if not text:
                 continue
+            t = int(mm) * 60 + (float(f"{ss}.{frac}") if frac else int(ss))
+            word_times = None
+            if "<" in text:
+                text, word_times = cls._parse_words(text, t)
+            times.append(t)
+            texts.append(text)
+            words.append(word_times)
+            # [00:12.00][01:30.00]chorus -> one entry per timestamp
+            for groups in cls.STAMP.findall(more_stamps) if more_stamps else ():
+                extra = cls._stamp_seconds(groups)
+                times.append(extra)
+                texts.append(text)
+                words.append(cls._shift_words(word_times, extra - t))
+
+        if any(b < a for a, b in zip(times, times[1:])):
+            order = sorted(range(len(times)), key=times.__getitem__)
+            times = [times[i] for i in order]
+            texts = [texts[i] for i in order]
+            words = [words[i] for i in order]
+
+        m = cls.OFFSET.search(synced_lyrics) if "[offset" in synced_lyrics.lower() else None
+        if m and int(m.group(1)):
+            # a positive offset shows lyrics earlier
+            offset = int(m.group(1)) / 1000.0
+            times = [max(0.0, t - offset) for t in times]
+            words = [cls._shift_words(w, -offset) for w in words]
+
+        return LrcLines(array("d", times), texts, words)
+
+    @staticmethod
+    def _stamp_seconds(groups) -> float:
+        mm, ss, frac = groups
+        return int(mm) * 60 + (float(f"{ss}.{frac}") if frac else int(ss))
+
+    @staticmethod
+    def _shift_words(words: WordTimes, delta: float) -> WordTimes:
+        if not words or not delta:
+            return words
+        return [(max(0.0, start + delta), seg) for start, seg in words]
+
+    @classmethod
+    def _parse_words(cls, text: str, line_time: float):
+        """Split enhanced LRC `<mm:ss.xx>` word tags out of a line"""
+        words: List[Tuple[float, str]] = []
+        start, pos = line_time, 0
+        for m in cls.WORD_TAG.finditer(text):
+            if m.start() > pos:
+                words.append((start, text[pos:m.start()]))
+            start, pos = int(m.group(1)) * 60 + float(m.group(2)), m.end()
+        if pos < len(text):
+            words.append((start, text[pos:]))
+        if not words:
+            return text, None
+        return "".join(w for _, w in words), words
+
+    def position(self, t: float) -> LyricPosition:
+        """Line (and word) at time t.
+
+        Normal playback only ever steps the cursor forward by one; a bisect
+        is needed only after a seek.
+        """
+        times = self._lines.times
+        n = len(times)
+        i = self._cursor
+        if not (0 <= i < n and times[i] <= t and (i + 1 == n or t < times[i + 1])):
+            if i + 1 < n and times[i + 1] <= t and (i + 2 >= n or t < times[i + 2]):
+                i += 1
+            else:
+                i = bisect_right(times, t) - 1
+            self._cursor = i
 
-            try:
-                time_str = line[1:line.index("]")]
-                text = line[line.index("]") + 1 :].strip()
+        if i < 0:
+            return LyricPosition(-1, "…" if n else "", times[0] if n else None)
 
-                # skip metadata like [ar:], [ti:]
-                if not re.match(r"^\d+:\d+(\.\d+)?$", time_str):
+        text, words = self._lines.texts[i], self._lines.words[i]
+        next_time = times[i + 1] if i + 1 < n else None
+        if not words:
+            return LyricPosition(i, text, next_time)
+
+        starts = [start for start, _ in words]
+        w = bisect_right(starts, t) - 1
+        if w + 1 < len(starts) and (next_time is None or starts[w + 1] < next_time):
+            next_time = starts[w + 1]
+        sung = sum(len(seg) for _, seg in words[: w + 1])
+        return LyricPosition(i, text, next_time, w, sung)
+
+    def current_line(self, t: float) -> str:
+        return self.position(t).text
+
+
+class LyricsWarmer:
+    """Bounded worker pool that loads lyrics ahead of the playhead.
+
+    Jobs are ordered by distance from the current playlist position;
+    focus() re-sorts the queue after a skip or jump. Each job carries an
+    abort future that cancel() resolves to stop a fetch already running.
+    """
+
+    URGENT = -1
+    BEHIND = 1_000_000
+
+    def __init__(self, fetch: Callable[[dict, Future, bool], "LyricsSync"], workers: int = 3):
+        self.fetch = fetch
+        self.workers = workers
+        self.position = 0
+        self._jobs: Dict[str, Future] = {}
+        self._aborts: Dict[str, Future] = {}
+        self._slots: Dict[str, int] = {}
+        self._tracks: Dict[str, dict] = {}
+        self._heap: list = []
+        self._queued: Dict[str, int] = {}
+        self._seq = itertools.count()
+        self._cond = threading.Condition()
+        self._threads: List[threading.Thread] = []
+
+    @staticmethod
+    def key(track: dict) -> str:
+        return track.get("videoId") or "|".join(YouTubeMusicPlayer.track_info(track))
+
+    def _priority(self, slot: Optional[int]) -> int:
+        if slot is None:
+            return self.URGENT
+        if slot >= self.position:
+            return slot - self.position
+        return self.BEHIND + self.position - slot
+
+    def submit(self, track: dict, slot: Optional[int] = None) -> Future:
+        """Queue a track (or join its job); slot=None means needed right now"""
+        key = self.key(track)
+        with self._cond:
+            job = self._jobs.get(key)
+            if job is None or job.cancelled() or self._failed(job):
+                job = Future()
+                self._jobs[key] = job
+                self._aborts[key] = Future()
+                self._tracks[key] = track
+            if slot is not None and key not in self._slots:
+                self._slots[key] = slot
+            if not job.running() and not job.done():
+                self._push(key, self._priority(None if slot is None else self._slots[key]))
+            self._ensure_workers()
+        return job
+
+    @staticmethod
+    def _failed(job: Future) -> bool:
+        """A finished job whose lookup errored or never got an answer is worth retrying"""
+        if not job.done():
+            return False
+        if job.exception() is not None:
+            return True
+        return not getattr(job.result(), "complete", True)
+
+    def warm(self, tracks: List[dict], start: int = 0, count: Optional[int] = None):
+        end = len(tracks) if count is None else min(len(tracks), start + count)
+        for slot in range(start, end):
+            self.submit(tracks[slot], slot)
+
+    def _push(self, key: str, prio: int):
+        if key in self._queued and self._queued[key] <= prio:
+            return
+        self._queued[key] = prio
+        heapq.heappush(self._heap, (prio, next(self._seq), key))
+        self._cond.notify()
+
+    def focus(self, position: int):
+        with self._cond:
+            self.position = position
+            self._queued = {
+                key: prio if prio == self.URGENT else self._priority(self._slots.get(key))
+                for key, prio in self._queued.items()
+            }
+            self._heap = [(prio, next(self._seq), key) for key, prio in self._queued.items()]
+            heapq.heapify(self._heap)
+
+    def forget(self, track: dict):
+        with self._cond:
+            key = self.key(track)
+            self._jobs.pop(key, None)
+            self._aborts.pop(key, None)
+            self._slots.pop(key, None)
+            self._tracks.pop(key, None)
+
+    def cancel(self, track: dict):
+        """Drop a track's job, aborting its fetch if one is in flight"""
+        with self._cond:
+            key = self.key(track)
+            job = self._jobs.get(key)
+            abort = self._aborts.get(key)
+            self._queued.pop(key, None)
+        self.forget(track)
+        if job:
+            job.cancel()
+        if abort and not abort.done():
+            abort.set_result(True)
+
+    def clear(self):
+        with self._cond:
+            for job in self._jobs.values():
+                job.cancel()
+            for abort in self._aborts.values():
+                if not abort.done():
+                    abort.set_result(True)
+            self._jobs.clear()
+            self._aborts.clear()
+            self._slots.clear()
+            self._tracks.clear()
+            self._heap.clear()
+            self._queued.clear()
+            self.position = 0
+
+    def _ensure_workers(self):
+        while len(self._threads) < self.workers:
+            t = threading.Thread(target=self._work, daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._heap:
+                    self._cond.wait()
+                prio, _, key = heapq.heappop(self._heap)
+                # stale entries (re-prioritized or already taken) are skipped
+                if self._queued.get(key) != prio:
                     continue
-                if not text:
+                del self._queued[key]
+                job = self._jobs.get(key)
+                abort = self._aborts.get(key)
+                track = self._tracks.get(key)
+                if job is None or track is None or not job.set_running_or_notify_cancel():
                     continue
+            try:
+                job.set_result(self.fetch(track, abort, prio == self.URGENT))
+            except Exception as e:
+                job.set_exception(e)
 
-                mm, ss = time_str.split(":", 1)
-                t = int(mm) * 60 + float(ss)
-                out.append(LrcLine(time=t, text=text))
-            except Exception:
-                continue
 
-        out.sort(key=lambda x: x.time)
-        return out
+# ASCII Animations
+class AnimationGrid:
+    """Static per-cell geometry for one canvas size, built once and reused every frame"""
+
+    SHADES = " ░▒▓█"
+    _grids: Dict[tuple, "AnimationGrid"] = {}
+
+    def __init__(self, width: int, height: int):
+        self.width = width
+        self.height = height
+        cx, cy = width // 2, height // 2
+        if np is not None:
+            ys, xs = np.mgrid[0:height, 0:width].astype(float)
+            dx, dy = xs - cx, ys - cy
+            self.dist = np.sqrt(dx ** 2 + dy ** 2 * 2)
+            self.vortex_dist = np.sqrt(dx ** 2 + (dy * 2) ** 2)
+            self.angle = np.arctan2(dy * 2, dx)
+            self.wave_a = xs * 0.3 + ys * 0.5
+            self.wave_b = xs * 0.2 + ys * 0.3
+        else:
+            rows = [[(x - cx, y - cy) for x in range(width)] for y in range(height)]
+            self.dist = [[math.sqrt(dx ** 2 + dy ** 2 * 2) for dx, dy in row] for row in rows]
+            self.vortex_dist = [[math.sqrt(dx ** 2 + (dy * 2) ** 2) for dx, dy in row] for row in rows]
+            self.angle = [[math.atan2(dy * 2, dx) for dx, dy in row] for row in rows]
+            self.wave_a = [[x * 0.3 + y * 0.5 for x in range(width)] for y in range(height)]
+            self.wave_b = [[x * 0.2 + y * 0.3 for x in range(width)] for y in range(height)]
+
+    @classmethod
+    def for_size(cls, width: int, height: int) -> "AnimationGrid":
+        grid = cls._grids.get((width, height))
+        if grid is None:
+            if len(cls._grids) >= 8:
+                cls._grids.clear()
+            grid = cls._grids[(width, height)] = cls(width, height)
+        return grid
+
+    def shade(self, field, thresholds: List[float], glyphs: str = SHADES) -> str:
+        """Map each cell to glyphs[number of ascending thresholds strictly below it]"""
+        if np is not None:
+            idx = np.searchsorted(np.asarray(thresholds), field, side="left")
+            return self.join(np.asarray(list(glyphs))[idx])
+        return "\n".join(
+            "".join([glyphs[bisect_left(thresholds, v)] for v in row]) for row in field
+        )
+
+    def mask(self, cells, glyph: str) -> str:
+        if np is not None:
+            return self.join(np.where(cells, glyph, " "))
+        return "\n".join("".join([glyph if c else " " for c in row]) for row in cells)
 
-    def current_line(self, t: float) -> str:
-        
-        if not self.lines:
-            return ""
+    def join(self, chars) -> str:
+        # a (h, w) array of single characters viewed as h strings of width w
+        rows = np.ascontiguousarray(chars, dtype="<U1").view(f"<U{self.width}")
+        return "\n".join(rows[:, 0].tolist())
 
-        if t < self.lines[0].time:
-            return "…"
 
-        
-        lo, hi = 0, len(self.lines) - 1
-        ans = 0
-        while lo <= hi:
-            mid = (lo + hi) // 2
-            if self.lines[mid].time <= t:
-                ans = mid
-                lo = mid + 1
-            else:
-                hi = mid - 1
+class FrameCache:
+    """LRU of rendered frames for animations that repeat over time_pos"""
 
-        return self.lines[ans].text
+    def __init__(self, max_frames: int = 2048):
+        self.max_frames = max_frames
+        self.frames: "OrderedDict[tuple, str]" = OrderedDict()
+
+    def get(self, key: tuple) -> Optional[str]:
+        frame = self.frames.get(key)
+        if frame is not None:
+            self.frames.move_to_end(key)
+        return frame
+
+    def put(self, key: tuple, frame: str):
+        self.frames[key] = frame
+        if len(self.frames) > self.max_frames:
+            self.frames.popitem(last=False)
+
+    def clear(self):
+        self.frames.clear()
 
 
-# ASCII Animations
 class ASCIIAnimator:
-    def __init__(self):
+    # seconds after which an animation repeats exactly (for a fixed intensity)
+    PERIODS = {
+        'wave': math.pi * 2,
+        'pulse': math.pi,
+        'circles': 8 / 5,
+        'vortex': math.pi / 6,
+    }
+    PHASE_STEP = 0.05
+    INTENSITY_LEVELS = 8
+
+    def __init__(self, width: int = 40, height: int = 8):
         self.frame = 0
         self.last_time = 0
         self.beat_history = []
+        self.grid = AnimationGrid.for_size(width, height)
+        self.cache = FrameCache()
+        self.bands: Optional[List[float]] = None
         self.animation_names = ['equalizer', 'wave', 'pulse', 'spectrum', 'circles', 'vortex']
         self.animations = {
             'equalizer': self._equalizer,
@@ -295,17 +1464,23 @@ class ASCIIAnimator:
         self.current_anim = self.animation_names[self.current_anim_index]
         self.frame = 0
         return self.current_anim  
+
+    def resize(self, width: int, height: int):
+        if (width, height) == (self.grid.width, self.grid.height):
+            return
+        self.grid = AnimationGrid.for_size(width, height)
+        self.cache.clear()
         
-    def get_frame(self, time_pos: float = 0) -> str:
+    def get_frame(self, time_pos: float = 0, bands: Optional[List[float]] = None) -> str:
         
         self.frame += 1
+        self.bands = bands
         
         # Detect tempo changes and create dynamic beat
         time_delta = time_pos - self.last_time if self.last_time > 0 else 0
         self.last_time = time_pos
         
         # Create multiple beat frequencies for variety
-        import math
         beat1 = abs(math.sin(time_pos * 2.0))  # 120 BPM
         beat2 = abs(math.sin(time_pos * 2.8))  # 168 BPM
         beat3 = abs(math.sin(time_pos * 1.5))  # 90 BPM
@@ -316,217 +1491,639 @@ class ASCIIAnimator:
         # Add frame-based randomness 
         random_factor = (self.frame % 7) / 10.0
         final_intensity = min(1.0, intensity + random_factor * 0.2)
-        
-        return self.animations[self.current_anim](final_intensity, time_pos)
+
+        if bands:
+            # real loudness from the analyzer, weighted toward the low end where the beat is
+            low = bands[: max(1, len(bands) // 4)]
+            final_intensity = min(1.0, 0.6 * sum(low) / len(low) + 0.4 * sum(bands) / len(bands))
+
+        period = self.PERIODS.get(self.current_anim)
+        if period is None:
+            return self.animations[self.current_anim](final_intensity, time_pos)
+
+        # periodic animations: snap phase and intensity so frames repeat and can be cached
+        steps = math.ceil(period / self.PHASE_STEP)
+        phase = int((time_pos % period) / period * steps) % steps
+        level = round(final_intensity * self.INTENSITY_LEVELS)
+        key = (self.current_anim, self.grid.width, self.grid.height, phase, level)
+        frame = self.cache.get(key)
+        if frame is None:
+            frame = self.animations[self.current_anim](level / self.INTENSITY_LEVELS, phase * period / steps)
+            self.cache.put(key, frame)
+        return frame
     
     def _equalizer(self, intensity: float, time_pos: float) -> str:
         """Equalizer bar """
-        import math
-        bars = []
-        
-        for i in range(16):
-
+        rows = self.grid.height - 1
+        count = self.grid.width * 2 // 5
+        if self.bands:
+            heights = [int(1 + (rows - 1) * self._band(i, count)) for i in range(count)]
+            return "\n".join(
+                "".join(["█" if h >= row else " " for h in heights]) for row in range(rows, 0, -1)
+            )
+
+        heights = []
+        for i in range(count):
             freq_offset = i * 0.7
             bar_beat = abs(math.sin((time_pos * 2.5) + freq_offset))
-            
-           
             noise = abs(math.sin(self.frame * 0.1 + i)) * 0.3
-            
-            height = int(1 + 6 * (bar_beat * 0.7 + intensity * 0.3 + noise))
-            bar_char = "█"
-            bars.append((bar_char * height).ljust(7))
-        
-        lines = []
-        for row in range(7, 0, -1):
-            line = ""
-            for bar in bars:
-                if len(bar.strip()) >= row:
-                    line += "█"
-                else:
-                    line += " "
-            lines.append(line)
-        return "\n".join(lines)
+            heights.append(int(1 + (rows - 1) * (bar_beat * 0.7 + intensity * 0.3 + noise)))
+
+        return "\n".join(
+            "".join(["█" if h >= row else " " for h in heights]) for row in range(rows, 0, -1)
+        )
     
+    def _band(self, i: int, count: int) -> float:
+        """Analyzer level for column i of count, stretched across the available bands"""
+        return self.bands[i * len(self.bands) // count]
+
     def _wave(self, intensity: float, time_pos: float) -> str:
         """Wave pattern """
-        import math
-        lines = []
-        
-        for y in range(8):
-            line = ""
-            for x in range(40):
-                # Create wave effect based on time and position
-                wave = math.sin((x * 0.3) + (time_pos * 3) + (y * 0.5))
-                wave2 = math.sin((x * 0.2) - (time_pos * 2) + (y * 0.3))
-                combined = (wave + wave2) / 2
-                
-                # Map to characters based on intensity
-                if combined > 0.6 * (1 - intensity * 0.5):
-                    char = "█"
-                elif combined > 0.3 * (1 - intensity * 0.5):
-                    char = "▓"
-                elif combined > 0:
-                    char = "▒"
-                elif combined > -0.3:
-                    char = "░"
-                else:
-                    char = " "
-                
-                line += char
-            lines.append(line)
-        return "\n".join(lines)
+        g = self.grid
+        t3, t2 = time_pos * 3, time_pos * 2
+        if np is not None:
+            combined = (np.sin(g.wave_a + t3) + np.sin(g.wave_b - t2)) / 2
+        else:
+            sin = math.sin
+            combined = [
+                [(sin(a + t3) + sin(b - t2)) / 2 for a, b in zip(row_a, row_b)]
+                for row_a, row_b in zip(g.wave_a, g.wave_b)
+            ]
+        scale = 1 - intensity * 0.5
+        return g.shade(combined, [-0.3, 0, 0.3 * scale, 0.6 * scale])
     
     def _pulse(self, intensity: float, time_pos: float) -> str:
         """Pulsing circles"""
-        import math
-        
-     
-        pulse1 = abs(math.sin(time_pos * 2.0))
-        pulse2 = abs(math.sin(time_pos * 3.0))
-        
-        lines = []
-        center_y, center_x = 4, 20
-        
-        for y in range(8):
-            line = ""
-            for x in range(40):
-                dist = math.sqrt((x - center_x) ** 2 + (y - center_y) ** 2 * 2)
-                
-                #  rings
-                ring1 = abs(dist - (pulse1 * 15)) < 2
-                ring2 = abs(dist - (pulse2 * 10)) < 1.5
-                
-                if ring1 or ring2:
-                    if intensity > 0.7:
-                        char = "●"
-                    elif intensity > 0.4:
-                        char = "○"
-                    else:
-                        char = "∘"
-                else:
-                    char = " "
-                
-                line += char
-            lines.append(line)
-        return "\n".join(lines)
+        g = self.grid
+        r1 = abs(math.sin(time_pos * 2.0)) * g.width * 0.375
+        r2 = abs(math.sin(time_pos * 3.0)) * g.width * 0.25
+
+        if intensity > 0.7:
+            char = "●"
+        elif intensity > 0.4:
+            char = "○"
+        else:
+            char = "∘"
+
+        if np is not None:
+            rings = (np.abs(g.dist - r1) < 2) | (np.abs(g.dist - r2) < 1.5)
+        else:
+            rings = [[abs(d - r1) < 2 or abs(d - r2) < 1.5 for d in row] for row in g.dist]
+        return g.mask(rings, char)
     
     def _spectrum(self, intensity: float, time_pos: float) -> str:
         """Audio spectrum """
-        import math
+        glyphs = "·░▒▓█"
         spectrum = []
-        
         for i in range(20):
-            # Each bar represents a frequency band
-            freq_response = abs(math.sin((time_pos * 2.5) + (i * 0.4)))
-            noise = abs(math.sin(self.frame * 0.15 + i * 0.3)) * 0.3
-            
-            height = freq_response * 0.6 + intensity * 0.4 + noise
-            
-            if height > 0.8:
-                char = "█"
-            elif height > 0.6:
-                char = "▓"
-            elif height > 0.4:
-                char = "▒"
-            elif height > 0.2:
-                char = "░"
+            if self.bands:
+                height = self._band(i, 20)
             else:
-                char = "·"
-            
-            spectrum.append(char * 2)
-        
-        return "\n".join([
-            " ".join(spectrum[0:5]),
-            " ".join(spectrum[5:10]),
-            " ".join(spectrum[10:15]),
-            " ".join(spectrum[15:20]),
-        ])
+                # Each bar represents a frequency band
+                freq_response = abs(math.sin((time_pos * 2.5) + (i * 0.4)))
+                noise = abs(math.sin(self.frame * 0.15 + i * 0.3)) * 0.3
+                height = freq_response * 0.6 + intensity * 0.4 + noise
+            spectrum.append(glyphs[bisect_left([0.2, 0.4, 0.6, 0.8], height)] * 2)
+
+        return "\n".join(" ".join(spectrum[i:i + 5]) for i in range(0, 20, 5))
     
     def _circles(self, intensity: float, time_pos: float) -> str:
         """Concentric circles pulsing outward"""
-        import math
-        
-        lines = []
-        center_y, center_x = 4, 20
-        
-        for y in range(8):
-            line = ""
-            for x in range(40):
-                dist = math.sqrt((x - center_x) ** 2 + (y - center_y) ** 2 * 2)
-                
-                #  expanding circles
-                circle_phase = (dist - time_pos * 5) % 8
-                
-                if circle_phase < 1.5 * (1 + intensity):
-                    if intensity > 0.7:
-                        char = "●"
-                    elif intensity > 0.5:
-                        char = "◉"
-                    elif intensity > 0.3:
-                        char = "○"
-                    else:
-                        char = "∘"
-                else:
-                    char = " "
-                
-                line += char
-            lines.append(line)
-        return "\n".join(lines)
+        g = self.grid
+        shift = time_pos * 5
+        width = 1.5 * (1 + intensity)
+
+        if intensity > 0.7:
+            char = "●"
+        elif intensity > 0.5:
+            char = "◉"
+        elif intensity > 0.3:
+            char = "○"
+        else:
+            char = "∘"
+
+        if np is not None:
+            rings = (g.dist - shift) % 8 < width
+        else:
+            rings = [[(d - shift) % 8 < width for d in row] for row in g.dist]
+        return g.mask(rings, char)
     
     def _vortex(self, intensity: float, time_pos: float) -> str:
         """Spinning vortex effect"""
-        import math
-        
-        lines = []
-        center_y, center_x = 4, 20
-        
-        for y in range(8):
-            line = ""
-            for x in range(40):
-                dx = x - center_x
-                dy = (y - center_y) * 2
-                
-                dist = math.sqrt(dx ** 2 + dy ** 2)
-                angle = math.atan2(dy, dx)
-                
-                # spiral pattern
-                spiral = (angle + time_pos * 2 + dist * 0.3) % (math.pi * 2)
-                spiral_intensity = abs(math.sin(spiral * 3))
-                
-                combined = spiral_intensity * (1 - dist / 30)
-                
-                if combined > 0.7 * (1 + intensity * 0.5):
-                    char = "█"
-                elif combined > 0.5:
-                    char = "▓"
-                elif combined > 0.3:
-                    char = "▒"
-                elif combined > 0.1:
-                    char = "░"
-                else:
-                    char = " "
-                
-                line += char
-            lines.append(line)
-        return "\n".join(lines)
+        g = self.grid
+        turn = time_pos * 2
+        tau = math.pi * 2
+        reach = g.width * 0.75
+        if np is not None:
+            spiral = (g.angle + turn + g.vortex_dist * 0.3) % tau
+            combined = np.abs(np.sin(spiral * 3)) * (1 - g.vortex_dist / reach)
+        else:
+            sin = math.sin
+            combined = [
+                [abs(sin(((a + turn + d * 0.3) % tau) * 3)) * (1 - d / reach) for a, d in zip(row_a, row_d)]
+                for row_a, row_d in zip(g.angle, g.vortex_dist)
+            ]
+        return g.shade(combined, [0.1, 0.3, 0.5, 0.7 * (1 + intensity * 0.5)])
+
+
+# Stream Resolution
+def run_tool(argv: List[str], procs: set, timeout: float) -> Tuple[int, str]:
+    """Run a helper like yt-dlp, registered in `procs` so stop_tools() can terminate it"""
+    # own process group: yt-dlp's ffmpeg children would otherwise keep the pipe open
+    proc = subprocess.Popen(argv, stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+                            start_new_session=True)
+    procs.add(proc)
+    try:
+        out, _ = proc.communicate(timeout=timeout)
+    except subprocess.TimeoutExpired:
+        stop_tools({proc}, signal.SIGKILL)
+        proc.communicate()
+        return -1, ""
+    finally:
+        procs.discard(proc)
+    return proc.returncode, out
+
+
+def stop_tools(procs: set, sig: int = signal.SIGTERM):
+    for proc in list(procs):
+        try:
+            os.killpg(proc.pid, sig)
+        except OSError:
+            pass
+
+
+class StreamResolver:
+    """Direct audio URLs from yt-dlp, resolved ahead of playback.
+
+    URLs are kept (on disk too) until shortly before the expiry signed into
+    them, so replays and queued tracks skip mpv's own ytdl step.
+    """
+
+    FORMAT = "bestaudio[ext=m4a]/bestaudio/best"
+    # must outlive a whole track, since mpv re-requests ranges while playing
+    MARGIN = 20 * 60
+
+    def __init__(self, workers: int = 3, path: Optional[str] = None):
+        self.binary = shutil.which("yt-dlp") or shutil.which("youtube-dl")
+        self.store = DiskCache(path or os.path.join(CACHE_DIR, "ytm-streams.sqlite3"), 4 * 1024 * 1024)
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers)
+        self._procs: set = set()
+        self._closed = False
+
+    @property
+    def enabled(self) -> bool:
+        return self.binary is not None and not self._closed
+
+    def close(self):
+        """Drop queued resolves and stop the running ones, so quitting doesn't wait for them"""
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        stop_tools(self._procs)
+
+    @staticmethod
+    def expiry(url: str) -> Optional[float]:
+        """Expiry timestamp of a signed googlevideo URL (query or path form)"""
+        parsed = urlparse(url)
+        value = parse_qs(parsed.query).get("expire", [None])[0]
+        if value is None:
+            m = re.search(r"/expire/(\d+)", parsed.path)
+            value = m.group(1) if m else None
+        try:
+            return float(value) if value else None
+        except ValueError:
+            return None
+
+    def cached(self, video_id: str) -> Optional[str]:
+        hit = self.store.get(f"url:{video_id}")
+        return hit[0] if hit else None
+
+    def prefetch(self, video_id: str) -> Future:
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job is None:
+                job = self._jobs[video_id] = self._pool.submit(self._resolve, video_id)
+                # finished jobs leave; a success lives on in the store
+                job.add_done_callback(lambda _: self._jobs.pop(video_id, None))
+        return job
+
+    def get(self, video_id: str, timeout: float) -> Optional[str]:
+        url = self.cached(video_id)
+        if url or not self.enabled:
+            return url
+        try:
+            return self.prefetch(video_id).result(timeout=timeout)
+        except Exception:
+            return None
+
+    def ready(self, video_id: str) -> bool:
+        """True once a fresh direct URL is cached"""
+        return self.cached(video_id) is not None
+
+    def _resolve(self, video_id: str) -> Optional[str]:
+        url = self.cached(video_id)
+        if url:
+            return url
+        try:
+            code, out = run_tool(
+                [self.binary, "-f", self.FORMAT, "-g", "--no-playlist", "--no-warnings",
+                 f"https://www.youtube.com/watch?v={video_id}"],
+                self._procs, timeout=30,
+            )
+        except Exception:
+            return None
+        lines = out.strip().splitlines()
+        if code != 0 or not lines:
+            return None
+        url = lines[0]
+        expires = self.expiry(url) or time.time() + 3600 + self.MARGIN
+        ttl = expires - time.time() - self.MARGIN
+        if ttl > 0:
+            self.store.put(f"url:{video_id}", url, ttl)
+        return url
+
+
+class AudioCache:
+    """Downloaded tracks keyed by videoId, capped in size with LRU eviction.
+
+    A track counts as cached only once its sidecar records the finished
+    size and the file on disk still matches it. Interrupted downloads stay
+    as yt-dlp .part files and are resumed next time.
+    """
+
+    def __init__(self, max_bytes: int, directory: Optional[str] = None):
+        self.max_bytes = max_bytes
+        self.dir = directory or os.path.join(CACHE_DIR, "ytm-audio")
+        self.binary = shutil.which("yt-dlp") or shutil.which("youtube-dl")
+        self.protected: set = set()
+        self._jobs: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=1)
+        self._procs: set = set()
+        self._closed = False
+        os.makedirs(self.dir, exist_ok=True)
+
+    def close(self):
+        """Drop queued downloads and stop the running one; its .part file resumes next time"""
+        self._closed = True
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        stop_tools(self._procs)
+
+    def _sidecar(self, video_id: str) -> str:
+        return os.path.join(self.dir, f"{video_id}.json")
+
+    def path(self, video_id: str) -> Optional[str]:
+        """Local file for a fully downloaded track (marks it recently used)"""
+        try:
+            with open(self._sidecar(video_id)) as f:
+                meta = json.load(f)
+            path = os.path.join(self.dir, meta["file"])
+            if os.path.getsize(path) != meta["size"]:
+                raise ValueError("size mismatch")
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError, KeyError):
+            self._remove(video_id)
+            return None
+        os.utime(path)
+        return path
+
+    def download(self, video_id: str) -> Optional[Future]:
+        if not self.binary or self.max_bytes <= 0 or self._closed:
+            return None
+        with self._lock:
+            job = self._jobs.get(video_id)
+            if job is None:
+                job = self._jobs[video_id] = self._pool.submit(self._download, video_id)
+                job.add_done_callback(lambda _: self._jobs.pop(video_id, None))
+        return job
+
+    def _download(self, video_id: str) -> Optional[str]:
+        if self.path(video_id):
+            return self.path(video_id)
+        try:
+            code, out = run_tool(
+                [self.binary, "-f", StreamResolver.FORMAT, "--no-playlist", "--continue",
+                 "--quiet", "--no-warnings", "--no-simulate", "--print", "after_move:filepath",
+                 "-o", os.path.join(self.dir, f"{video_id}.%(ext)s"),
+                 f"https://www.youtube.com/watch?v={video_id}"],
+                self._procs, timeout=900,
+            )
+        except Exception:
+            return None
+        lines = out.strip().splitlines()
+        path = lines[-1] if lines else ""
+        if code != 0 or not os.path.isfile(path) or os.path.getsize(path) == 0:
+            return None
+
+        with open(self._sidecar(video_id), "w") as f:
+            json.dump({"file": os.path.basename(path), "size": os.path.getsize(path)}, f)
+        self._evict()
+        return path
+
+    def _remove(self, video_id: str):
+        for name in os.listdir(self.dir):
+            if name.startswith(f"{video_id}."):
+                try:
+                    os.remove(os.path.join(self.dir, name))
+                except OSError:
+                    pass
+
+    def _evict(self):
+        entries = []
+        for name in os.listdir(self.dir):
+            if name.endswith((".json", ".part", ".ytdl")):
+                continue
+            path = os.path.join(self.dir, name)
+            video_id = name.split(".", 1)[0]
+            try:
+                st = os.stat(path)
+            except OSError:
+                continue
+            entries.append((st.st_mtime, st.st_size, video_id))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, video_id in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            if video_id in self.protected:
+                continue
+            self._remove(video_id)
+            total -= size
+
+
+# Playlist Loading
+class PlaylistLoader:
+    """Playlist tracks that arrive in batches.
+
+    The first page is fetched up front so playback can start; the rest
+    is paged in on a background thread while earlier tracks play.
+    """
+
+    FIRST_BATCH = 100
+
+    def __init__(self, ytmusic, playlist_id: str, on_batch: Optional[Callable[["PlaylistLoader"], None]] = None):
+        self.ytmusic = ytmusic
+        self.playlist_id = playlist_id
+        self.on_batch = on_batch
+        self.tracks: List[dict] = []
+        self.total: Optional[int] = None
+        self.error: Optional[str] = None
+        self._raw_count = 0
+        self._done = False
+        self._cond = threading.Condition()
+
+    @classmethod
+    def from_tracks(cls, tracks: List[dict]) -> "PlaylistLoader":
+        loader = cls(None, "")
+        loader._add(tracks)
+        loader.total = len(loader.tracks)
+        loader._finish()
+        return loader
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def start(self, variants: List[str]) -> Optional[str]:
+        """Fetch the first page from the first ID variant that works; returns that variant"""
+        for attempt_id in variants:
+            try:
+                playlist = self.ytmusic.get_playlist(attempt_id, limit=self.FIRST_BATCH)
+            except Exception as e:
+                self.error = str(e)
+                continue
+            tracks = playlist.get("tracks") or []
+            if not tracks:
+                continue
+            self.total = playlist.get("trackCount") or None
+            self._add(tracks)
+            # without a trackCount, a full first page may not be the end
+            more = self.total > len(tracks) if self.total else len(tracks) >= self.FIRST_BATCH
+            if more:
+                threading.Thread(target=self._fetch_rest, args=(attempt_id,), daemon=True).start()
+            else:
+                self._finish()
+            return attempt_id
+        self._finish()
+        return None
+
+    def wait_for(self, index: int, timeout: Optional[float] = None) -> bool:
+        """Block until track `index` is loaded; False if the playlist is shorter"""
+        with self._cond:
+            self._cond.wait_for(lambda: index < len(self.tracks) or self._done, timeout)
+            return index < len(self.tracks)
+
+    def wait_all(self) -> List[dict]:
+        with self._cond:
+            self._cond.wait_for(lambda: self._done)
+        return self.tracks
+
+    def count(self) -> int:
+        """Best known playlist length, for 'Track i/N' labels"""
+        return max(len(self.tracks), self.total or 0) if not self._done else len(self.tracks)
+
+    def _add(self, raw_tracks: List[dict]):
+        with self._cond:
+            self._raw_count += len(raw_tracks)
+            self.tracks.extend(t for t in raw_tracks if t.get("videoId"))
+            self._cond.notify_all()
+        if self.on_batch:
+            self.on_batch(self)
+
+    def _finish(self):
+        with self._cond:
+            self._done = True
+            self._cond.notify_all()
+
+    def _fetch_rest(self, attempt_id: str):
+        # ytmusicapi follows the continuations itself but has no offset, so
+        # the first page comes back again and is skipped
+        try:
+            playlist = self.ytmusic.get_playlist(attempt_id, limit=None)
+            self._add((playlist.get("tracks") or [])[self._raw_count:])
+        except Exception as e:
+            self.error = str(e)
+        finally:
+            self._finish()
+
+
+# Rendering
+class PlayerView:
+    """Playback panel that is only rebuilt when its inputs change.
+
+    "live" hands the panel to rich's Live; "region" renders it to lines
+    once and rewrites just the terminal rows that differ from the last
+    frame, which keeps output tiny over slow SSH links.
+    """
+
+    MODES = ("live", "region")
+
+    def __init__(self, mode: str = "live"):
+        self.mode = mode
+        self.live: Optional[Live] = None
+        self.last_key: Optional[tuple] = None
+        self.lines: List[str] = []
+
+    def __enter__(self):
+        if self.mode == "live":
+            self.live = Live(console=console, auto_refresh=False, screen=True)
+            self.live.__enter__()
+        else:
+            console.set_alt_screen(True)
+            console.show_cursor(False)
+        return self
+
+    def __exit__(self, *exc):
+        if self.live:
+            self.live.__exit__(*exc)
+            self.live = None
+        else:
+            console.show_cursor(True)
+            console.set_alt_screen(False)
+        return False
+
+    def invalidate(self):
+        self.last_key = None
+        self.lines = []
+
+    def update(self, title: str, body: str, style: str, height: int, progress: str = "", highlight: int = 0) -> bool:
+        """Redraw if anything visible changed; returns whether it did"""
+        key = (title, body, style, height, progress, highlight, console.size)
+        if key == self.last_key:
+            return False
+        self.last_key = key
+
+        content = Text(body, style=style)
+        if highlight:
+            content.stylize("bold yellow", 0, highlight)
+        panel = Panel(
+            Align.center(content, vertical="middle"),
+            title=title,
+            subtitle=progress or None,
+            border_style="cyan",
+            height=height,
+        )
+        if self.live:
+            self.live.update(panel, refresh=True)
+        else:
+            self._draw_region(panel)
+        return True
+
+    def _draw_region(self, panel: Panel):
+        with console.capture() as capture:
+            console.print(panel)
+        lines = capture.get().rstrip("\n").split("\n")
+
+        out = []
+        if len(lines) != len(self.lines):
+            out.append("\x1b[2J")
+            self.lines = []
+        for row, line in enumerate(lines):
+            if row < len(self.lines) and self.lines[row] == line:
+                continue
+            out.append(f"\x1b[{row + 1};1H{line}\x1b[K")
+        self.lines = lines
+        if out:
+            console.file.write("".join(out))
+            console.file.flush()
 
 
 # Main
 class YouTubeMusicPlayer:
-    def __init__(self):
+    AUDIO_AHEAD = 2
+    SEEK_STEP = 5
+    VOLUME_STEP = 5
+    KEY_BINDINGS = {
+        "space": ("cycle", "pause"),
+        "p": ("cycle", "pause"),
+        "play_pause": ("cycle", "pause"),
+        "left": ("seek", -SEEK_STEP, "relative"),
+        "right": ("seek", SEEK_STEP, "relative"),
+        "up": ("add", "volume", VOLUME_STEP),
+        "down": ("add", "volume", -VOLUME_STEP),
+        "volume_up": ("add", "volume", VOLUME_STEP),
+        "volume_down": ("add", "volume", -VOLUME_STEP),
+        "m": ("cycle", "mute"),
+        "mute": ("cycle", "mute"),
+        "n": ("playlist-next", "force"),
+        "next": ("playlist-next", "force"),
+    }
+
+    def __init__(self, offline: bool = False, warm_ahead: Optional[int] = None, render_mode: str = "live", audio_cache_mb: int = 0):
         try:
             
-            self.ytmusic = YTMusic()
+            ytmusic = YTMusic()
         except Exception as e:
             console.print(f"[yellow]Note: Running without authentication[/yellow]")
             console.print(f"[dim]Some playlists may not be accessible[/dim]")
           
-            self.ytmusic = YTMusic()
+            ytmusic = YTMusic()
+        # repeat searches and playlist loads render from the local cache first
+        self.ytmusic = CachedYTMusic(ytmusic, MetadataCache(offline=offline))
         
+        self.lyrics_cache = LyricsCache(offline=offline)
+        # the same client (session, pool, rate limit) the placeholder LyricsSync()s fall back to
+        self.lrclib = LrclibClient.shared()
         self.lyrics = LyricsSync()
         self.mpv = MPVPlayer()
-        self.next_lyrics = LyricsSync()
-        self.prefetch_thread = None
+        # one bounded pool serves playback, next-track prefetch and playlist warm-up
+        self.lyrics_warmer = LyricsWarmer(self._load_lyrics)
+        self.warm_ahead = warm_ahead
+        self.render_mode = render_mode
+        self.playlist_variants: Dict[str, str] = {}
+        self.resolver = StreamResolver()
+        self.audio_cache = AudioCache(audio_cache_mb * 1024 * 1024) if audio_cache_mb > 0 else None
+
+    def close(self):
+        """Stop background yt-dlp work so quitting doesn't wait for queued resolves and downloads"""
+        self.resolver.close()
+        if self.audio_cache:
+            self.audio_cache.close()
+
+    @staticmethod
+    def track_info(track: dict):
+        title = track.get("title", "Unknown")
+        artist = track["artists"][0]["name"] if track.get("artists") else "Unknown"
+        album = track.get("album", {}).get("name", "") if track.get("album") else ""
+        return title, artist, album
+
+    @staticmethod
+    def canvas_size():
+        """(panel height, animation width, animation height) for the current terminal"""
+        width, height = console.size
+        panel_height = max(12, height)
+        return panel_height, max(20, min(160, width - 4)), max(4, min(40, panel_height - 4))
+
+    @staticmethod
+    def progress_label(t: float, duration: float) -> str:
+        if duration <= 0:
+            return ""
+        fmt = lambda secs: f"{int(secs) // 60}:{int(secs) % 60:02d}"
+        return f"{fmt(t)} / {fmt(duration)}"
+
+    @staticmethod
+    def track_url(track: dict) -> str:
+        return f"https://www.youtube.com/watch?v={track.get('videoId')}"
+
+    def stream_source(self, track: dict, wait: float = 0.0) -> str:
+        """What mpv should open: a local copy, a fresh direct URL, or else the watch page"""
+        video_id = track.get("videoId")
+        if self.audio_cache:
+            path = self.audio_cache.path(video_id)
+            if path:
+                return path
+        url = self.resolver.cached(video_id)
+        if not url and wait and self.resolver.enabled:
+            # resolving here costs what mpv's ytdl hook would, and warms the cache
+            url = self.resolver.get(video_id, wait)
+        return url or self.track_url(track)
+
+    def report_startup(self):
+        startup = self.mpv.startup
+        style = "red" if startup.error else "dim"
+        console.print(f"[{style}]{startup}[/{style}]\n")
 
     def extract_playlist_id(self, url: str) -> Optional[str]:
         
@@ -540,45 +2137,38 @@ class YouTubeMusicPlayer:
                 return match.group(1)
         return None
 
+    def open_playlist(self, playlist_id: str) -> Optional[PlaylistLoader]:
+        """Load the first page of a playlist; the rest streams in while it plays"""
+        console.print(f"[cyan]Loading playlist...[/cyan]")
+
+        # the ID variant (VL-prefixed or bare) that worked last time goes first
+        variants = [playlist_id, playlist_id.replace('VL', ''), f"VL{playlist_id}"]
+        known = self.playlist_variants.get(playlist_id)
+        if known:
+            variants.insert(0, known)
+        variants = list(dict.fromkeys(variants))
+
+        loader = PlaylistLoader(self.ytmusic, playlist_id, on_batch=lambda l: self.warm_playlist(l.tracks, self.lyrics_warmer.position))
+        used = loader.start(variants)
+        if not loader.tracks:
+            if loader.error:
+                console.print(f"[red]Error: {loader.error[:100]}[/red]")
+            console.print("[red]Unable to load playlist directly[/red]")
+            console.print("[yellow]This playlist might be private or unavailable[/yellow]")
+            console.print("[cyan]Tip: Try making the playlist public or use a different playlist[/cyan]")
+            return None
+
+        self.playlist_variants[playlist_id] = used
+        if loader.done:
+            console.print(f"[green]{len(loader.tracks)} valid tracks ready to play[/green]")
+        else:
+            console.print(f"[green]Found {loader.total} tracks, starting with the first {len(loader.tracks)}[/green]")
+        return loader
+
     def get_playlist_tracks(self, playlist_id: str) -> List[dict]:
         """Get all tracks from a playlist"""
-        try:
-            console.print(f"[cyan]Loading playlist...[/cyan]")
-            
-            
-            for attempt_id in [playlist_id, playlist_id.replace('VL', ''), f"VL{playlist_id}"]:
-                try:
-                    playlist = self.ytmusic.get_playlist(attempt_id, limit=200)
-                    tracks = playlist.get('tracks', [])
-                    if tracks:
-                        break
-                except:
-                    continue
-            
-            if not tracks:
-                console.print("[red]Unable to load playlist directly[/red]")
-                console.print("[yellow]This playlist might be private or unavailable[/yellow]")
-                console.print("[cyan]Tip: Try making the playlist public or use a different playlist[/cyan]")
-                return []
-            
-            console.print(f"[green]Found {len(tracks)} tracks in playlist[/green]")
-            
-            #filter
-            valid_tracks = []
-            for track in tracks:
-                if track.get('videoId'):
-                    valid_tracks.append(track)
-            
-            if valid_tracks:
-                console.print(f"[green]{len(valid_tracks)} valid tracks ready to play[/green]")
-            
-            return valid_tracks
-            
-        except Exception as e:
-            console.print(f"[red]Error: {str(e)[:100]}[/red]")
-            console.print("[yellow]This playlist may be private or require authentication[/yellow]")
-            console.print("[cyan]Try: 1) Search songs manually, or 2) Use a public playlist[/cyan]")
-            return []
+        loader = self.open_playlist(playlist_id)
+        return loader.wait_all() if loader else []
 
     def search_track(self, query: str):
         console.print(f"[cyan]Searching for: {query}[/cyan]")
@@ -601,28 +2191,38 @@ class YouTubeMusicPlayer:
             return results[idx]
         return None
 
-    def prefetch_next_lyrics(self, track: dict):
+    def _load_lyrics(self, track: dict, abort: Optional[Future] = None, urgent: bool = True) -> LyricsSync:
+        """Race lrclib's exact and search lookups only for the track that's playing; warm-up goes one at a time"""
+        lyrics = LyricsSync(cache=self.lyrics_cache, client=self.lrclib)
+        lyrics.fetch_lyrics(*self.track_info(track), verbose=False, video_id=track.get("videoId", ""), abort=abort, race=urgent)
+        return lyrics
 
-        def fetch():
-            title = track.get("title", "Unknown")
-            artist = track["artists"][0]["name"] if track.get("artists") else "Unknown"
-            album = track.get("album", {}).get("name", "") if track.get("album") else ""
-            self.next_lyrics.fetch_lyrics(title, artist, album)
-        
-        self.prefetch_thread = threading.Thread(target=fetch, daemon=True)
-        self.prefetch_thread.start()
+    def request_lyrics(self, track: dict, slot: Optional[int] = None) -> Future:
+        """Start (or join) the lyrics fetch for a track"""
+        return self.lyrics_warmer.submit(track, slot)
 
-    def play_track(self, track: dict, playlist_mode: bool = False, track_num: int = 0, total_tracks: int = 0, next_track: Optional[dict] = None):
-        title = track.get("title", "Unknown")
-        artist = track["artists"][0]["name"] if track.get("artists") else "Unknown"
-        album = track.get("album", {}).get("name", "") if track.get("album") else ""
+    def prefetch_next_lyrics(self, track: dict, slot: Optional[int] = None):
+        self.request_lyrics(track, slot)
+
+    def warm_playlist(self, tracks: List[dict], position: int = 0):
+        """Queue lyrics for the next warm_ahead tracks (all of them by default)"""
+        self.lyrics_warmer.focus(position)
+        self.lyrics_warmer.warm(tracks, position, self.warm_ahead)
+
+    def play_track(self, track: dict, playlist_mode: bool = False, track_num: int = 0, total_tracks: int = 0, next_track: Optional[dict] = None, on_tick: Optional[Callable[[float, float], None]] = None):
+        title, artist, album = self.track_info(track)
         video_id = track.get("videoId")
 
         if not video_id:
             console.print("[red]No videoId found for this track.[/red]")
             return False
 
-        url = f"https://www.youtube.com/watch?v={video_id}"
+        # in playlist mode mpv is already running this track as entry track_num - 1
+        entry = track_num - 1 if playlist_mode else None
+        if self.audio_cache:
+            # keep a copy so the next play is local; never evict what is playing
+            self.audio_cache.protected = {video_id}
+            self.audio_cache.download(video_id)
 
         console.clear()
         if playlist_mode:
@@ -630,95 +2230,213 @@ class YouTubeMusicPlayer:
         else:
             console.print(f"[bold green]Now Playing:[/bold green] {title} - {artist}\n")
 
-        has_lyrics = self.lyrics.fetch_lyrics(title, artist, album)
-        
-        if has_lyrics:
-            console.print(f"[green]Loaded {len(self.lyrics.lines)} lyric lines[/green]\n")
+        # reuse a finished or in-flight prefetch; only a miss starts a new fetch
+        lyrics_job = self.request_lyrics(track)
+        if lyrics_job.done():
+            self.lyrics = lyrics_job.result()
+            lyrics_job = None
+            if self.lyrics:
+                console.print(f"[green]Loaded {len(self.lyrics)} lyric lines[/green]\n")
+            else:
+                console.print("[yellow]Playing without lyrics - showing animation[/yellow]\n")
         else:
-            console.print("[yellow]Playing without lyrics - showing animation[/yellow]\n")
-
+            self.lyrics = LyricsSync()
+            console.print("[cyan]Lyrics still loading, starting playback...[/cyan]\n")
+        has_lyrics = bool(self.lyrics)
 
         if next_track:
             console.print("[dim]Prefetching next track's lyrics...[/dim]\n")
-            self.prefetch_next_lyrics(next_track)
+            self.prefetch_next_lyrics(next_track, track_num if playlist_mode else None)
 
-        self.mpv.play(url)
-        console.print("[dim]Press Ctrl+C to stop | Ctrl+W to change animation[/dim]\n")
+        if not playlist_mode:
+            self.mpv.play(self.stream_source(track, wait=15))
+            self.report_startup()
+        console.print("[dim]Space pause | ←/→ seek | ↑/↓ volume | n/b next/previous | Ctrl+W animation | Ctrl+C stop[/dim]\n")
 
-        animator = ASCIIAnimator() if not has_lyrics else None
-        keyboard = KeyboardListener()
-        keyboard.start()
+        panel_height, canvas_w, canvas_h = self.canvas_size()
+        animator = ASCIIAnimator(canvas_w, canvas_h)
+        analyzer = AudioAnalyzer(self.mpv.time_pos, lambda: self.mpv.seek_count) if AudioAnalyzer.available() else None
+        title_text = f"{title} - {artist}"
+        if playlist_mode:
+            title_text += f" ({track_num}/{total_tracks})"
         user_stopped = False
 
         try:
-            with Live(console=console, refresh_per_second=20, screen=True) as live:
-                while self.mpv.is_playing():
-                    t = self.mpv.time_pos()
-                    
-
-                    if not has_lyrics and animator:
-                        key = keyboard.get_key()
-                        if key == 'ctrl_w':
-                            new_anim = animator.switch_animation()
-
-                            console.print(f"[cyan]Switched to: {new_anim}[/cyan]")
-                    
-                    if has_lyrics:
-                        current = self.lyrics.current_line(t)
-                        content = Text(current, style="bold white")
-                    else:
-
-                        anim_text = animator.get_frame(t)
-                        content = Text(anim_text, style="cyan")
-                    
-                    title_text = f"{title} - {artist}"
-                    if playlist_mode:
-                        title_text += f" ({track_num}/{total_tracks})"
-                    
-                    panel = Panel(
-                        Align.center(content, vertical="middle"),
-                        title=title_text,
-                        border_style="cyan",
-                        height=12,
-                    )
-                    live.update(panel)
-                    time.sleep(0.05)
+            asyncio.run(self._play_loop(title_text, entry, lyrics_job, animator, analyzer, on_tick))
         except KeyboardInterrupt:
             user_stopped = True
             console.print("\n[yellow]Stopped by user[/yellow]")
         finally:
-            keyboard.stop()
-            self.mpv.stop()
+            if analyzer:
+                analyzer.stop()
+            # a skipped track's lyrics are no longer wanted; stop fetching them now
+            self.lyrics_warmer.cancel(track)
+            if user_stopped or not playlist_mode:
+                self.mpv.stop()
         
         return user_stopped  
 
-    def play_playlist(self, tracks: List[dict]):
-        """Play all tracks in a playlist"""
-        total = len(tracks)
-        for i, track in enumerate(tracks, 1):
+    async def _play_loop(self, title_text: str, entry: Optional[int], lyrics_job: Optional[Future], animator: ASCIIAnimator, analyzer: Optional[AudioAnalyzer], on_tick: Optional[Callable[[float, float], None]]):
+        """Render until the track ends, all on one event loop.
 
-            next_track = tracks[i] if i < total else None
-            
-            console.print(f"\n[bold cyan]Track {i}/{total}[/bold cyan]")
-            user_stopped = self.play_track(track, playlist_mode=True, track_num=i, total_tracks=total, next_track=next_track)
-            
+        mpv state changes, a finished lyrics fetch and key presses each wake
+        the loop directly; otherwise it sleeps until the next lyric boundary
+        (or animation frame).
+        """
+        loop = asyncio.get_running_loop()
+        wake = asyncio.Event()
+
+        def poke(*_):
+            # called from the IPC and lyrics worker threads
+            try:
+                loop.call_soon_threadsafe(wake.set)
+            except RuntimeError:
+                pass
+
+        def on_key(key: str):
+            # runs on the loop as each key arrives; mpv's reply wakes the render
+            if key in ("b", "prev"):
+                if entry:
+                    self.mpv.command("playlist-prev", "force")
+                else:
+                    self.mpv.command("seek", 0, "absolute")
+            elif key in self.KEY_BINDINGS:
+                self.mpv.command(*self.KEY_BINDINGS[key])
+            elif key == 'ctrl_w' and not self.lyrics:
+                new_anim = animator.switch_animation()
+                console.print(f"[cyan]Switched to: {new_anim}[/cyan]")
+                wake.set()
+
+        self.mpv.add_watcher(poke)
+        if lyrics_job is not None:
+            lyrics_job.add_done_callback(poke)
+        keyboard = KeyboardListener(on_key)
+        keyboard.start(loop)
+        analyzing = False
+        has_lyrics = bool(self.lyrics)
+        timeout = 0.0
+
+        try:
+            with PlayerView(self.render_mode) as view:
+                while not self.mpv.finished(entry):
+                    try:
+                        await asyncio.wait_for(wake.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+                    wake.clear()
+                    t = self.mpv.time_pos()
+
+                    panel_height, canvas_w, canvas_h = self.canvas_size()
+                    animator.resize(canvas_w, canvas_h)
+
+                    if on_tick:
+                        on_tick(t, self.mpv.duration())
+
+                    if lyrics_job is not None and lyrics_job.done():
+                        if not lyrics_job.cancelled():
+                            self.lyrics = lyrics_job.result()
+                        lyrics_job = None
+                        has_lyrics = bool(self.lyrics)
+                        if has_lyrics and analyzer and analyzing:
+                            # the animation is gone; don't keep decoding the stream for it
+                            analyzer.stop()
+
+                    current_entry = entry is None or self.mpv.state.playlist_pos == entry
+                    if analyzer and not analyzing and not has_lyrics and current_entry and self.mpv.duration() > 0:
+                        # only once mpv has opened the stream, so its resolved URL is known
+                        source = self.mpv.stream_url()
+                        if source:
+                            analyzer.start(source)
+                        analyzing = True
+
+                    highlight = 0
+                    if has_lyrics:
+                        pos = self.lyrics.position(t)
+                        body, style, highlight = pos.text, "bold white", pos.sung
+                        # next redraw: lyric/word boundary or the progress label's next second
+                        timeout = 1.0 - t % 1.0
+                        if pos.next_time is not None:
+                            timeout = min(timeout, pos.next_time - t)
+                        if self.mpv.state.pause:
+                            timeout = 1.0
+                        timeout = max(0.005, timeout)
+                    else:
+                        body = animator.get_frame(t, analyzer.bands_at(t) if analyzer else None)
+                        style = "cyan"
+                        timeout = 0.05
+
+                    view.update(title_text, body, style, panel_height, self.progress_label(t, self.mpv.duration()), highlight)
+        finally:
+            keyboard.stop()
+            self.mpv.remove_watcher(poke)
+
+    def play_playlist(self, tracks):
+        """Play all tracks in a playlist (a list, or a PlaylistLoader still paging in)"""
+        loader = tracks if isinstance(tracks, PlaylistLoader) else PlaylistLoader.from_tracks(tracks)
+        if not loader.wait_for(0):
+            return
+        if self.resolver.enabled:
+            for upcoming in loader.tracks[:3]:
+                self.resolver.prefetch(upcoming["videoId"])
+        # one mpv for the whole list; the next entry is queued as soon as it resolves
+        self.mpv.start_playlist(self.stream_source(loader.tracks[0], wait=15))
+        self.report_startup()
+        i = 0
+
+        def queue_next(t: float, duration: float):
+            index = self.mpv.playlist_count
+            if index != i + 1 or index >= len(loader.tracks):
+                return
+            video_id = loader.tracks[index]["videoId"]
+            near_end = duration > 0 and duration - t < 20
+            if not self.resolver.enabled or self.resolver.ready(video_id) or near_end:
+                self.mpv.queue(self.stream_source(loader.tracks[index]))
+
+        while loader.wait_for(i):
+            track = loader.tracks[i]
+            next_track = loader.tracks[i + 1] if loader.wait_for(i + 1, timeout=0) else None
+            total = loader.count()
+            self.warm_playlist(loader.tracks, i)
+            if self.resolver.enabled:
+                for upcoming in loader.tracks[i + 1:i + 3]:
+                    self.resolver.prefetch(upcoming["videoId"])
+            if self.audio_cache:
+                for upcoming in loader.tracks[i:i + 1 + self.AUDIO_AHEAD]:
+                    self.audio_cache.download(upcoming["videoId"])
+
+            # recover if mpv ran dry (e.g. the next entry wasn't loaded in time)
+            while self.mpv.playlist_count <= i:
+                self.mpv.queue(self.stream_source(loader.tracks[self.mpv.playlist_count]))
+            if self.mpv.state.idle_active and self.mpv.state.playlist_pos == -1:
+                self.mpv.play_index(i)
+
+            console.print(f"\n[bold cyan]Track {i + 1}/{total}[/bold cyan]")
+            user_stopped = self.play_track(track, playlist_mode=True, track_num=i + 1, total_tracks=total, next_track=next_track, on_tick=queue_next)
 
             if user_stopped:
+                self.lyrics_warmer.clear()
                 console.print("[yellow]Playlist stopped. Returning to search...[/yellow]")
                 return
             
-            
-            if next_track:
-                self.lyrics = self.next_lyrics
-                self.next_lyrics = LyricsSync()
-          
-            if i < total:
-                time.sleep(1)  
-        
+            if not self.mpv.is_playing():
+                break
+            # follow mpv: usually the next entry, but n/b can move either way
+            pos = self.mpv.state.playlist_pos
+            i = pos if 0 <= pos != i else i + 1
+
+        self.mpv.stop()
+        self.lyrics_warmer.clear()
         console.print("\n[green]✓ Playlist finished![/green]")
 
 
 def main():
+    parser = argparse.ArgumentParser(description="YouTube Music player with synced lyrics")
+    parser.add_argument("--offline", action="store_true", help="answer lyrics, searches and playlists from the local cache only")
+    parser.add_argument("--warm-ahead", type=int, metavar="N", help="preload lyrics for the next N playlist tracks (default: all)")
+    parser.add_argument("--render", choices=PlayerView.MODES, default="live", help="'region' redraws only changed terminal rows (good over SSH)")
+    parser.add_argument("--audio-cache", type=int, default=0, metavar="MB", help="keep up to MB of downloaded audio for instant, offline replays")
+    args = parser.parse_args()
+
     console.print(
         Panel.fit(
             "[bold cyan]YouTube Music Player[/bold cyan]\n[dim]by deb[/dim]",
@@ -726,7 +2444,7 @@ def main():
         )
     )
 
-    player = YouTubeMusicPlayer()
+    player = YouTubeMusicPlayer(offline=args.offline, warm_ahead=args.warm_ahead, render_mode=args.render, audio_cache_mb=args.audio_cache)
 
     while True:
         try:
@@ -739,9 +2457,9 @@ def main():
             # Check if it's a playlist URL
             playlist_id = player.extract_playlist_id(q)
             if playlist_id:
-                tracks = player.get_playlist_tracks(playlist_id)
-                if tracks:
-                    player.play_playlist(tracks)
+                loader = player.open_playlist(playlist_id)
+                if loader:
+                    player.play_playlist(loader)
             else:
                 # Regular search
                 track = player.search_track(q)
@@ -753,6 +2471,7 @@ def main():
             break
         except Exception as e:
             console.print(f"[red]Error: {e}[/red]")
+    player.close()
 
 
 if __name__ == "__main__":